@@ -1,90 +1,191 @@
-import pandas as pd
-import re
-import nltk
-from nltk.corpus import stopwords
+import hashlib
+import os
 from pathlib import Path
 
-# --- הגדרות והורדות ---
-nltk.download('stopwords', quiet=True)
+# ניקוי הטקסט עבר ל-text_cleaning.py (כדי ששלבים אחרים יוכלו לייבא אותו)
+from text_cleaning import STOP_WORDS, clean_text_batch, normalize_authors
+import metrics
+from clean_cache import CleanCache, stop_words_version
+from near_duplicates import NearDuplicateIndex
+from schema import read_articles
+from token_store import TokenStoreWriter
 
 PROJECT_DIR = Path(r"C:\Users\yuval\Desktop\לימודים\ML")
 INPUT_FILE = PROJECT_DIR / "sensed_data.csv"
 OUTPUT_FILE = PROJECT_DIR / "processed_data_separated.csv"  # שיניתי שם כדי שיהיה ברור שזה מופרד
 
-STOP_WORDS = set(stopwords.words('english'))
+# תהליכים לניקוי עמודות גדולות (1 = בלי multiprocessing)
+CLEAN_WORKERS = os.cpu_count() or 1
 
+# כמה שורות נקראות בכל פעם (None = כל הקובץ בבת אחת)
+CHUNK_ROWS = 20000
 
-def clean_text_noise(text):
-    """
-    מנקה רעשים ומסיר Stop Words (אותה פונקציה, תופעל על כל עמודה בנפרד)
-    """
-    if not isinstance(text, str):
-        return ""
+# מטמון של טקסט נקי בין ריצות (None = בלי מטמון), מתרוקן לבד כש-STOP_WORDS משתנה
+CLEAN_CACHE_FILE = PROJECT_DIR / "clean_cache.sqlite"
+CLEAN_CACHE_MAX_BYTES = 2 * 1024 ** 3
 
-    # 1. המרה לקטנות
-    text = text.lower()
+# מזהי המילים של עמודות הטקסט הנקיות (token_store.py), כדי ששלב המאפיינים לא יפרק שוב את המחרוזות
+# (None = בלי)
+TOKENS_DIR = PROJECT_DIR / "processed_tokens"
 
-    # 2. השארת אותיות בלבד
-    text = re.sub(r'[^a-z\s]', '', text)
+# כתבות כמעט זהות (גרסאות מעודכנות של אותה כתבה ב-URL אחר) לפי MinHash/LSH על body + trail_text
+# (None = בלי). האינדקס נשמר בין ריצות, כך שרק כתבות חדשות מחושבות
+NEAR_DUP_THRESHOLD = 0.8
+NEAR_DUP_INDEX_FILE = PROJECT_DIR / "near_duplicates.npz"
 
-    # 3. טוקניזציה
-    words = text.split()
+TEXT_COLUMNS = ['title', 'trail_text', 'tags', 'body']
+# העמודות ששלב המאפיינים בונה מהן TF-IDF, רק להן נכתבים מזהי מילים
+TOKEN_COLUMNS = ['trail_text', 'tags']
+FINAL_COLUMNS = ['label', 'title', 'trail_text', 'tags', 'body', 'author', 'date', 'url']
 
-    # 4. הסרת מילות עצירה ומילים קצרות
-    filtered_words = [w for w in words if w not in STOP_WORDS and len(w) > 2]
 
-    return " ".join(filtered_words)
+def url_key(url):
+    """
+    מפתח של 8 בתים לכל URL, כדי שקבוצת ה-URL שכבר נראו תישאר קטנה גם בקורפוס ענק.
+    (NaN מקבל מפתח משלו, כמו ב-drop_duplicates)
+    """
+    if not isinstance(url, str):
+        return -1
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
 
 
-def main():
-    print("--- Starting Pre-processing (Cleaning Separate Columns) ---")
+def drop_seen_urls(df, seen):
+    """
+    drop_duplicates(subset=['url']) על פני כל ה-chunks: שומרת את ההופעה הראשונה בלבד.
+    """
+    keys = df['url'].map(url_key)
+    keep = ~keys.duplicated() & ~keys.isin(seen)
+    seen.update(keys[keep])
+    return df[keep]
 
-    if not INPUT_FILE.exists():
-        print(f"Error: {INPUT_FILE} not found.")
-        return
 
-    df = pd.read_csv(INPUT_FILE)
-    initial_count = len(df)
-    print(f"Loaded {initial_count} articles.")
+def drop_near_duplicates(df, index):
+    """
+    משאירה רק את הגרסה הראשונה של כל כתבה שחוזרת כמעט זהה (על הטקסט הנקי),
+    גם מול כתבות מ-chunks ומריצות קודמות שכבר באינדקס.
+    """
+    texts = (df['trail_text'] + ' ' + df['body']).tolist()
+    # המפתח של כל כתבה באינדקס: ה-URL, ולכתבה בלי URL - הטקסט עצמו
+    # (בלי הביט העליון, כדי שייכנס ל-int64)
+    keys = [url_key(url if isinstance(url, str) else text) >> 1 for url, text in zip(df['url'], texts)]
+    duplicate_of = index.add(keys, texts)
+    return df[duplicate_of < 0]
 
-    # 1. ניקוי שורות בסיסי (כפילויות וחסרים)
-    df = df.dropna(subset=['title'])
-    df = df.drop_duplicates(subset=['url'])
 
+def clean_frame(df, cache=None):
+    """
+    ניקוי הכותב ועמודות הטקסט, וסינון לפי Trail Text (שלבים 2-4).
+    """
     # 2. ניקוי שם הכותב
-    df['author'] = df['author'].fillna('unknown').astype(str)
-    df['author'] = df['author'].apply(lambda x: x.lower().replace('by ', '').strip())
+    df['author'] = normalize_authors(df['author'])
 
     # 3. ניקוי עמודות הטקסט (בנפרד!)
-    text_columns = ['title', 'trail_text', 'tags', 'body']
-
-    print(f"Cleaning text columns: {text_columns}...")
-
-    for col in text_columns:
+    for col in TEXT_COLUMNS:
         # מילוי ערכים חסרים כדי שהפונקציה לא תיכשל
         df[col] = df[col].fillna('')
-        # הפעלת פונקציית הניקוי על העמודה הנוכחית
-        df[col] = df[col].apply(clean_text_noise)
+        # הפעלת פונקציית הניקוי על כל העמודה בבת אחת (אותה תוצאה כמו clean_text_noise)
+        df[col] = clean_text_batch(df[col], workers=CLEAN_WORKERS, cache=cache)
 
     # 4. סינון: נשמור רק כתבות שיש בהן לפחות מיני-כותרת (Trail Text) תקינה
     # (כי זה מה שרצית להשתמש בו בשלב הבא)
     df = df[df['trail_text'].str.len() > 2]
 
-    # 5. שמירה
     # אנחנו שומרים את כל העמודות המקוריות (אחרי שניקינו אותן)
     # אין יותר 'processed_text' מאוחד
-    final_columns = ['label', 'title', 'trail_text', 'tags', 'body', 'author', 'date', 'url']
-
     # סינון העמודות שקיימות בפועל ב-df
-    cols_to_save = [c for c in final_columns if c in df.columns]
+    cols_to_save = [c for c in FINAL_COLUMNS if c in df.columns]
+    return df[cols_to_save]
 
-    df[cols_to_save].to_csv(OUTPUT_FILE, index=False)
 
-    print(f"Success! Saved separated processed data to: {OUTPUT_FILE}")
-    print(f"Final article count: {len(df)}")
+@metrics.stage("preprocess")
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE, chunk_rows=CHUNK_ROWS, cache_file=CLEAN_CACHE_FILE,
+         tokens_dir=TOKENS_DIR, near_dup_threshold=NEAR_DUP_THRESHOLD, near_dup_file=NEAR_DUP_INDEX_FILE):
+    """
+    קוראת את sensed_data.csv ב-chunks של chunk_rows שורות, מנקה כל chunk וכותבת אותו מיד,
+    כך שהזיכרון לא גדל עם הקובץ. chunk_rows=None קוראת את כל הקובץ בבת אחת.
+    """
+    print("--- Starting Pre-processing (Cleaning Separate Columns) ---")
+
+    if not input_file.exists():
+        print(f"Error: {input_file} not found.")
+        return
+
+    print(f"Cleaning text columns: {TEXT_COLUMNS}...")
+
+    # טיפוסים קבועים (schema.py) כדי שכל chunk יקבל אותם טיפוסים, בלי קשר לתוכן שלו.
+    # התאריך נשאר מחרוזת, כדי שייכתב לפלט בדיוק כמו שהגיע
+    if chunk_rows:
+        chunks = read_articles(input_file, with_body=True, dates=False, chunksize=chunk_rows)
+    else:
+        chunks = [read_articles(input_file, with_body=True, dates=False)]
+
+    seen_urls = set()
+    initial_count = 0
+    final_count = 0
+    sample = None
+    cache = CleanCache(cache_file, CLEAN_CACHE_MAX_BYTES) if cache_file else None
+    tokens = TokenStoreWriter(tokens_dir, TOKEN_COLUMNS) if tokens_dir else None
+    near_dups = None
+    if near_dup_threshold:
+        # הטקסט הנקי תלוי ב-STOP_WORDS, אז אינדקס שנבנה עם רשימה אחרת מתחיל מחדש
+        near_dups = NearDuplicateIndex.load(near_dup_file, threshold=near_dup_threshold,
+                                            version=stop_words_version(STOP_WORDS))
+    near_dup_count = 0
+
+    try:
+        for chunk_number, df in enumerate(chunks):
+            initial_count += len(df)
+
+            # 1. ניקוי שורות בסיסי (כפילויות וחסרים)
+            df = df.dropna(subset=['title'])
+            df = drop_seen_urls(df, seen_urls)
+
+            with metrics.timer("preprocess.clean_frame"):
+                df = clean_frame(df, cache)
+            if near_dups is not None:
+                before = len(df)
+                with metrics.timer("preprocess.near_duplicates"):
+                    df = drop_near_duplicates(df, near_dups)
+                near_dup_count += before - len(df)
+            if tokens is not None:
+                with metrics.timer("preprocess.tokens"):
+                    tokens.add_frame(df)
+
+            # 5. שמירה (ה-chunk הראשון כותב גם את הכותרות)
+            with metrics.timer("preprocess.write_csv"):
+                df.to_csv(output_file, index=False, mode='w' if chunk_number == 0 else 'a',
+                          header=chunk_number == 0)
+
+            final_count += len(df)
+            if sample is None and len(df):
+                sample = df['trail_text'].iloc[0]
+
+        # ה-manifest נכתב רק בסוף ריצה שהצליחה, אחרת שלב המאפיינים פשוט לא ישתמש במזהים
+        if tokens is not None:
+            tokens.close(source=output_file)
+        if near_dups is not None:
+            near_dups.save(near_dup_file)
+    finally:
+        if cache is not None:
+            stats = cache.stats()
+            print(f"Clean cache: {stats['hits']} hits, {stats['misses']} misses "
+                  f"({stats['hit_rate']:.0%}), {stats['evictions']} evicted, {stats['entries']} entries")
+            cache.close()
+
+    metrics.count("preprocess.rows_read", initial_count)
+    metrics.count("preprocess.rows_written", final_count)
+    if output_file.exists():
+        metrics.count("preprocess.bytes_written", output_file.stat().st_size)
+    print(f"Loaded {initial_count} articles.")
+    if near_dups is not None:
+        sizes = near_dups.cluster_sizes()
+        print(f"Near duplicates dropped: {near_dup_count} "
+              f"(index: {sum(sizes.values())} stories with more than one version, largest {max(sizes, default=1)})")
+    print(f"Success! Saved separated processed data to: {output_file}")
+    print(f"Final article count: {final_count}")
     print("Sample of cleaned Trail Text:")
-    print(df['trail_text'].iloc[0])
+    print(sample)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
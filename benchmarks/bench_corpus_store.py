@@ -0,0 +1,92 @@
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from corpus_store import CorpusStore
+from data_collection import create_article_content
+from sensing import iter_labeled_articles
+from synthetic_corpus import SECTIONS, make_api_article
+
+# Write and scan throughput: one .txt per article (old layout) vs the sharded corpus store.
+# Note the scan runs with a warm page cache, a cold cache widens the gap further.
+
+
+def disk_usage(root):
+    files = [p for p in Path(root).rglob("*") if p.is_file()]
+    return len(files), sum(p.stat().st_size for p in files)
+
+
+def make_pages(n_articles, page_size=50):
+    per_section = n_articles // len(SECTIONS)
+    for section in SECTIONS:
+        for start in range(0, per_section, page_size):
+            articles = [make_api_article(section, i) for i in range(start, min(per_section, start + page_size))]
+            yield section, [(a["id"].replace("/", "_"), create_article_content(a)) for a in articles]
+
+
+def write_files(root, pages):
+    for section, page in pages:
+        output_dir = root / section
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for article_id, content in page:
+            (output_dir / f"{article_id}.txt").write_text(content, encoding="utf-8")
+
+
+def write_store(root, pages):
+    store = CorpusStore(root)
+    for section, page in pages:
+        store.append(section, [{"id": article_id, "text": content} for article_id, content in page])
+
+
+def scan(data_dir, corpus_dir):
+    return sum(1 for _ in iter_labeled_articles(data_dir, corpus_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"Generating {args.articles} synthetic articles...")
+    pages = list(make_pages(args.articles))
+    n = sum(len(page) for _, page in pages)
+
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        files_dir = tmp / "files"
+        store_dir = tmp / "store"
+        results = {}
+
+        start = time.perf_counter()
+        write_files(files_dir, pages)
+        results["files_write"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        write_store(store_dir, pages)
+        results["store_write"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assert scan(files_dir, tmp / "no-store") == n
+        results["files_scan"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assert scan(files_dir, store_dir) == n
+        results["store_scan"] = time.perf_counter() - start
+
+        print(f"\n{'LAYOUT':<10} | {'FILES':>7} | {'MB':>8} | {'WRITE/s':>10} | {'SCAN/s':>10}")
+        print("-" * 56)
+        for layout, root in (("files", files_dir), ("store", store_dir)):
+            count, size = disk_usage(root)
+            print(f"{layout:<10} | {count:>7} | {size / 1e6:>8.1f} | "
+                  f"{n / results[layout + '_write']:>10.0f} | {n / results[layout + '_scan']:>10.0f}")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.linear_model import LogisticRegression
+
+from data_collection import create_article_record
+from feature_pipeline import FeaturePipeline
+from feature_service import CLASSIFIER_FILE, load_batcher, make_server
+from sensing import record_to_row
+from synthetic_corpus import SECTIONS, make_api_article
+
+# Per-article latency (p50 / p99) of feature_service over HTTP, with N
+# concurrent clients, without micro-batching (max batch 1) and with it.
+
+
+def fit_models(model_dir, n_rows):
+    per_section = n_rows // len(SECTIONS)
+    rows = [{"label": section, **record_to_row(create_article_record(make_api_article(section, i)))}
+            for section in SECTIONS for i in range(per_section)]
+    df = pd.DataFrame(rows)
+    pipeline = FeaturePipeline()
+    X = sparse.hstack([X for _, X, _ in pipeline.fit_transform_blocks(df)], format='csr')
+    pipeline.save(model_dir)
+    joblib.dump(LogisticRegression(max_iter=200).fit(X, df['label']), Path(model_dir) / CLASSIFIER_FILE)
+    return per_section
+
+
+def post(url, article):
+    body = json.dumps(article).encode("utf-8")
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        json.loads(response.read())
+    return time.perf_counter() - start
+
+
+def run(model_dir, articles, clients, max_batch):
+    batcher = load_batcher(model_dir, max_batch=max_batch)
+    server = make_server(batcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    url = f"http://{host}:{port}/featurize"
+
+    post(url, articles[0])  # warm-up
+    batches_before = batcher.batches
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = np.array(list(pool.map(lambda a: post(url, a), articles)))
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    server.server_close()
+    batcher.close()
+    return latencies, elapsed, batcher.batches - batches_before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--train-rows", type=int, default=8000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        print(f"Fitting the feature pipeline and a classifier on {args.train_rows} synthetic articles...")
+        per_section = fit_models(model_dir, args.train_rows)
+        # Articles the models have not seen
+        articles = [make_api_article(SECTIONS[i % len(SECTIONS)], per_section + i) for i in range(args.requests)]
+
+        print(f"\n{'CLIENTS':>7} | {'MAX BATCH':>9} | {'BATCHES':>7} | {'p50 ms':>7} | {'p99 ms':>7} | {'articles/s':>10}")
+        print("-" * 65)
+        for clients in args.clients:
+            for max_batch in (1, 64):
+                latencies, elapsed, batches = run(model_dir, articles, clients, max_batch)
+                p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+                print(f"{clients:>7} | {max_batch:>9} | {batches:>7} | {p50:>7.1f} | {p99:>7.1f} | "
+                      f"{len(articles) / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from bench_sparse_features import author_block, make_frame
+from feature_store import export_csv, load_features, save_features
+
+# Save / load time and size on disk of the feature matrix:
+# dataset_features_final.csv (before) vs the binary feature store (after).
+
+
+def dir_size(path):
+    return sum(p.stat().st_size for p in Path(path).iterdir()) / 1024 ** 2
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"Building {args.rows} synthetic processed rows...")
+    df = make_frame(args.rows)
+    trail_vectorizer = TfidfVectorizer(max_features=1000)
+    tags_vectorizer = TfidfVectorizer(max_features=500)
+    X_trail = trail_vectorizer.fit_transform(df['trail_text'])
+    X_tags = tags_vectorizer.fit_transform(df['tags'])
+    X_authors, author_columns = author_block(df)
+
+    X = sparse.hstack([X_trail, X_tags, X_authors], format='csr')
+    columns = ([f"trail_{w}" for w in trail_vectorizer.get_feature_names_out()]
+               + [f"tag_{w}" for w in tags_vectorizer.get_feature_names_out()] + author_columns)
+    blocks = [("trail", X_trail.shape[1], X_trail.dtype), ("tag", X_tags.shape[1], X_tags.dtype),
+              ("auth", X_authors.shape[1], X_authors.dtype)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = Path(tmp) / "features"
+        csv_file = Path(tmp) / "dataset_features_final.csv"
+
+        _, save_store = timed(save_features, store_dir, X, columns, df['label'], blocks)
+        _, save_csv = timed(export_csv, store_dir, csv_file)
+
+        # Loading includes one full pass over the values, as a training job would
+        _, load_mmap = timed(lambda: load_features(store_dir)[0].sum())
+        _, load_ram = timed(lambda: load_features(store_dir, mmap=False)[0].sum())
+        _, load_csv = timed(lambda: pd.read_csv(csv_file).drop(columns='label').to_numpy().sum())
+
+        print(f"\nMatrix {X.shape}, {X.nnz} non-zeros")
+        print(f"\n{'FORMAT':<18} | {'SAVE s':>7} | {'LOAD s':>7} | {'SIZE MB':>8}")
+        print("-" * 50)
+        print(f"{'csv':<18} | {save_csv:>7.2f} | {load_csv:>7.2f} | {csv_file.stat().st_size / 1024 ** 2:>8.1f}")
+        print(f"{'store (mmap)':<18} | {save_store:>7.2f} | {load_mmap:>7.2f} | {dir_size(store_dir):>8.1f}")
+        print(f"{'store (in memory)':<18} | {save_store:>7.2f} | {load_ram:>7.2f} | {dir_size(store_dir):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
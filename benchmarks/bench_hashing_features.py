@@ -0,0 +1,74 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from bench_sparse_features import make_frame
+from feature_analysis import top_terms
+from hashing_features import IncrementalTfidf
+
+# TfidfVectorizer(max_features) (current) vs IncrementalTfidf (hashing mode)
+# on trail text and tags:
+#   - rows/s of fit_transform over the whole corpus
+#   - overlap of the top-10 terms per label (what analyze_top_features shows)
+#   - keeping the features current over a stream of collector batches:
+#     refit on the whole history every batch vs partial_fit on the new batch
+
+FIELDS = {'trail_text': 1000, 'tags': 500}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batches", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"Building {args.rows} synthetic processed rows...")
+    df = make_frame(args.rows).sample(frac=1, random_state=0).reset_index(drop=True)
+    n = len(df)
+
+    print(f"\n{'FIELD':<11} | {'tfidf rows/s':>12} | {'hashing rows/s':>14} | {'top-10 overlap':>14} | "
+          f"{'refit x' + str(args.batches) + ' s':>12} | {'partial_fit s':>13}")
+    print("-" * 92)
+    for field, max_features in FIELDS.items():
+        texts = df[field]
+
+        start = time.perf_counter()
+        tfidf = TfidfVectorizer(max_features=max_features)
+        X_tfidf = tfidf.fit_transform(texts)
+        tfidf_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hashing = IncrementalTfidf()
+        X_hashing = hashing.fit_transform(texts)
+        hashing_time = time.perf_counter() - start
+
+        top_tfidf = top_terms(X_tfidf, df['label'], tfidf.get_feature_names_out())
+        top_hashing = top_terms(X_hashing, df['label'], hashing.get_feature_names_out())
+        overlaps = [len({t for t, _ in top_tfidf[label]} & {t for t, _ in top_hashing[label]}) / 10
+                    for label in top_tfidf]
+
+        # The same corpus arriving in batches: what it costs to have features for every new batch
+        bounds = [n * i // args.batches for i in range(args.batches + 1)]
+        start = time.perf_counter()
+        for end in bounds[1:]:
+            TfidfVectorizer(max_features=max_features).fit(texts[:end])
+        refit_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stream = IncrementalTfidf()
+        for begin, end in zip(bounds, bounds[1:]):
+            stream.partial_fit(texts[begin:end])
+            stream.transform(texts[begin:end])
+        partial_time = time.perf_counter() - start
+
+        print(f"{field:<11} | {n / tfidf_time:>12.0f} | {n / hashing_time:>14.0f} | "
+              f"{sum(overlaps) / len(overlaps):>14.0%} | {refit_time:>12.2f} | {partial_time:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
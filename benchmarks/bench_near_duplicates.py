@@ -0,0 +1,141 @@
+import argparse
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from near_duplicates import NearDuplicateIndex
+from synthetic_corpus import LEXICON, SECTIONS, make_api_article
+from text_cleaning import clean_text_batch
+
+# Near-duplicate detection on a synthetic corpus with planted duplicates:
+# DUPLICATE_SHARE of the stories get 1-4 extra versions, each the original
+# with EDIT_SHARE of its words replaced and an update sentence appended,
+# under a new URL and shuffled into the stream like the collector would add them.
+#   - articles/s of NearDuplicateIndex.add, batch by batch (stays flat = near-linear)
+#   - recall / precision against the planted clusters, cluster sizes found vs planted
+#   - exact pairwise Jaccard on a sample, extrapolated to the corpus (quadratic)
+#   - save / load of the index, and adding one more collector batch after load
+#   - an empty index (a run that kept no articles) still loads and takes new articles
+
+DUPLICATE_SHARE = 0.1
+EDIT_SHARE = 0.01
+
+
+def make_corpus(n_articles, seed=0):
+    """[(key, cleaned trail_text + body, story id)] in arrival order, and the planted cluster sizes."""
+    rng = random.Random(seed)
+    n_stories = int(n_articles / (1 + DUPLICATE_SHARE * 2.5))
+    raw = [make_api_article(SECTIONS[i % len(SECTIONS)], i // len(SECTIONS), seed=seed) for i in range(n_stories)]
+    texts = clean_text_batch([a["fields"]["trailText"] + " " + a["fields"]["bodyText"] for a in raw])
+
+    # (arrival position, text, story): versions arrive a little after their original
+    articles = [(story, text, story) for story, text in enumerate(texts)]
+    planted = Counter()
+    for story, text in enumerate(texts):
+        if rng.random() >= DUPLICATE_SHARE:
+            continue
+        versions = rng.randint(1, 4)
+        planted[versions + 1] += 1
+        words = text.split()
+        for _ in range(versions):
+            edited = [rng.choice(LEXICON) if rng.random() < EDIT_SHARE else w for w in words]
+            edited += rng.choices(LEXICON, k=12)
+            articles.append((story + rng.randint(1, 2000) + 0.5, " ".join(edited), story))
+
+    articles.sort(key=lambda article: article[0])
+    stream = [(key, text, story) for key, (_, text, story) in enumerate(articles)]
+    return stream, planted
+
+
+def pairwise_seconds(texts, k):
+    """Exact Jaccard of word shingles between every pair of texts."""
+    start = time.perf_counter()
+    sets = [{tuple(words[i:i + k]) for i in range(len(words) - k + 1)} for words in (t.split() for t in texts)]
+    for i in range(len(sets)):
+        for j in range(i):
+            len(sets[i] & sets[j]) / max(len(sets[i] | sets[j]), 1)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=10000, help="articles per add() call (collector batch)")
+    parser.add_argument("--pairwise-sample", type=int, default=1500)
+    args = parser.parse_args()
+
+    print(f"Building ~{args.articles} synthetic cleaned articles with planted near-duplicates...")
+    stream, planted = make_corpus(args.articles)
+    keys = [key for key, _, _ in stream]
+    texts = [text for _, text, _ in stream]
+    stories = [story for _, _, story in stream]
+    print(f"{len(stream)} articles, {sum(planted.values())} stories with more than one version")
+
+    index = NearDuplicateIndex()
+    print(f"\n{'BATCH':>5} | {'articles':>8} | {'articles/s':>10}")
+    print("-" * 31)
+    total_time = 0.0
+    result = []
+    for number, begin in enumerate(range(0, len(stream), args.batch)):
+        start = time.perf_counter()
+        result.extend(index.add(keys[begin:begin + args.batch], texts[begin:begin + args.batch]).tolist())
+        elapsed = time.perf_counter() - start
+        total_time += elapsed
+        print(f"{number:>5} | {index.size:>8} | {min(args.batch, len(stream) - begin) / elapsed:>10.0f}")
+    print(f"Total: {total_time:.1f}s, {len(stream) / total_time:.0f} articles/s")
+
+    # A version is found when it points at an article of its own story
+    flagged = [i for i, duplicate_of in enumerate(result) if duplicate_of >= 0]
+    correct = sum(stories[result[i]] == stories[i] for i in flagged)
+    first_seen = {}
+    for i, story in enumerate(stories):
+        first_seen.setdefault(story, i)
+    expected = sum(first_seen[story] != i for i, story in enumerate(stories))
+    print(f"\nRecall {correct / max(expected, 1):.1%} ({correct} of {expected} later versions), "
+          f"precision {correct / max(len(flagged), 1):.1%} ({len(flagged)} flagged)")
+    found = index.cluster_sizes()
+    print(f"{'SIZE':>4} | {'planted':>7} | {'found':>5}")
+    for size in sorted(set(planted) | set(found)):
+        print(f"{size:>4} | {planted[size]:>7} | {found[size]:>5}")
+
+    sample = texts[:args.pairwise_sample]
+    sample_time = pairwise_seconds(sample, index.shingle_size)
+    estimate = sample_time * (len(stream) / len(sample)) ** 2
+    print(f"\nExact pairwise Jaccard: {sample_time:.1f}s for {len(sample)} articles, "
+          f"~{estimate / 3600:.1f}h estimated for {len(stream)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "near_duplicates.npz"
+        start = time.perf_counter()
+        index.save(path)
+        save_time = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = NearDuplicateIndex.load(path)
+        load_time = time.perf_counter() - start
+        print(f"\nSave {save_time:.2f}s ({path.stat().st_size / 1024 ** 2:.1f} MB), load {load_time:.2f}s")
+
+    # The next collector batch: versions of already indexed stories under new keys
+    extra = [f"{text} {' '.join(LEXICON[:5])}" for text in texts[:1000]]
+    start = time.perf_counter()
+    extra_result = loaded.add(range(len(stream), len(stream) + len(extra)), extra)
+    print(f"Adding 1000 articles after load: {time.perf_counter() - start:.2f}s, "
+          f"{(extra_result >= 0).sum()} found as near-duplicates")
+
+    # An index saved by a run that kept no articles must load and keep working
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "empty.npz"
+        NearDuplicateIndex().save(path)
+        empty = NearDuplicateIndex.load(path)
+        round_trip = empty.add([1, 2], [texts[0], texts[0]]).tolist()
+        if round_trip != [-1, 0]:
+            raise AssertionError(f"empty index round trip gave {round_trip}, expected [-1, 0]")
+        print("Empty index save / load / add: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_sparse_features import make_frame
+from feature_pipeline import FeaturePipeline
+
+# FeaturePipeline.fit_transform_blocks with the trail, tag and author blocks
+# fitted one after another (workers=1) vs trail and tag in two worker
+# processes (workers=2). Checks both give the same columns and values.
+# The speedup needs at least two free cores; on one core the pool only adds
+# its start-up and the pickling of the columns and fitted blocks.
+
+
+def fit(df, text_mode, workers):
+    pipeline = FeaturePipeline(text_mode=text_mode)
+    start = time.perf_counter()
+    blocks = pipeline.fit_transform_blocks(df, cleaned=True, workers=workers)
+    return blocks, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"Building {args.rows} synthetic processed rows ({os.cpu_count()} cores)...")
+    df = make_frame(args.rows)
+
+    print(f"\n{'MODE':<8} | {'sequential s':>12} | {'2 workers s':>11} | {'speedup':>7} | {'same result':>11}")
+    print("-" * 62)
+    for text_mode in ("tfidf", "hashing"):
+        sequential, sequential_time = fit(df, text_mode, 1)
+        parallel, parallel_time = fit(df, text_mode, 2)
+        same = all(name_a == name_b and columns_a == columns_b and (X_a != X_b).nnz == 0
+                   for (name_a, X_a, columns_a), (name_b, X_b, columns_b) in zip(sequential, parallel))
+        print(f"{text_mode:<8} | {sequential_time:>12.2f} | {parallel_time:>11.2f} | "
+              f"{sequential_time / parallel_time:>6.2f}x | {str(same):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+from corpus_store import CorpusStore
+from data_collection import CATEGORIES, api_section_for, create_article_content
+from feature_store import load_manifest
+from metrics import METRICS_ENV
+from pipeline import ROOT, load_module, project_paths, run_features, run_preprocess, run_report, run_sense
+from stub_guardian_server import start_in_background
+from synthetic_corpus import START_DATE, make_api_article
+
+# End-to-end run of the pipeline on a synthetic corpus, no API key or Windows
+# paths needed. The articles come from one of two sources (--source):
+#   collect  - api: data_collection backfill against a local stub_guardian_server
+#   files    - files: old-layout article .txt files (data/<category>/<id>.txt)
+# and then
+#   sense    - sensing.py over the corpus store or the .txt tree
+#   preprocess, features, report - Pre-Processing.py, feature_extraction_2.py, yuval_feature.py
+# Every stage runs in its own process, and the wall time, items/s and peak RSS of
+# that process (and its worker processes) are appended to a JSON results file, with
+# the commit, so runs of different commits can be compared:
+#
+#   python benchmarks/bench_pipeline.py --articles 100000
+#
+# BENCH_WORK_DIR / BENCH_RESULTS override the default work directory (a temporary
+# one, deleted afterwards unless --keep) and results file. With --metrics the
+# stages run with PIPELINE_METRICS on (metrics.py) and their timers and counters
+# are stored with the results.
+
+STAGES = ["collect", "files", "sense", "preprocess", "features", "report"]
+RESULTS_FILE = Path(__file__).resolve().parent / "results" / "pipeline.json"
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process and of its largest finished child, in MB (None on Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in KB on Linux, in bytes on macOS
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def csv_rows(path, column):
+    return len(pd.read_csv(path, usecols=[column]))
+
+
+# --- Stage bodies, run by the child process ---
+
+def stage_collect(paths, config):
+    data_collection = load_module("data_collection.py")
+    if config["rate"]:
+        data_collection.REQUESTS_PER_SECOND_PER_KEY = config["rate"]
+    last = START_DATE + timedelta(hours=config["per_section"] - 1)
+    data_collection.main(config["base_url"], paths["data_dir"], mode="backfill",
+                         from_date=START_DATE.date(), to_date=last.date())
+    return len(CorpusStore(paths["corpus_dir"]).index)
+
+
+def stage_files(paths, config):
+    # The same articles the stub would serve, one .txt per article as the collector used to save them
+    count = 0
+    for category in CATEGORIES:
+        output_dir = paths["data_dir"] / category
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(config["per_section"]):
+            article = make_api_article(api_section_for(category), i, seed=config["seed"])
+            (output_dir / f"{article['id'].replace('/', '_')}.txt").write_text(
+                create_article_content(article), encoding="utf-8")
+            count += 1
+    return count
+
+
+def stage_sense(paths, config):
+    run_sense(paths, {"workers": config["workers"]})
+    return csv_rows(paths["sensed_file"], "url")
+
+
+def stage_preprocess(paths, config):
+    run_preprocess(paths, {})
+    return csv_rows(paths["sensed_file"], "url")
+
+
+def stage_features(paths, config):
+    run_features(paths, {"text_mode": config["text_mode"], "trail_features": 1000, "tag_features": 500,
+                         "workers": config["workers"]})
+    return load_manifest(paths["features_dir"])["shape"][0]
+
+
+def stage_report(paths, config):
+    # The report reads the feature store, not the processed CSV
+    run_report(paths, {})
+    return load_manifest(paths["features_dir"])["shape"][0]
+
+
+STAGE_BODIES = {"files": stage_files, "collect": stage_collect, "sense": stage_sense,
+                "preprocess": stage_preprocess, "features": stage_features, "report": stage_report}
+
+
+def run_stage_here(name, project_dir, config, result_file):
+    """Child process: runs one stage and writes its measurements to result_file."""
+    start = time.perf_counter()
+    items = STAGE_BODIES[name](project_paths(project_dir), config)
+    seconds = time.perf_counter() - start
+    result = {"seconds": round(seconds, 3), "items": items,
+              "items_per_second": round(items / seconds, 1) if seconds else None, "peak_rss_mb": peak_rss_mb()}
+    Path(result_file).write_text(json.dumps(result), encoding="utf-8")
+
+
+def run_stage(name, project_dir, config, log):
+    """Runs a stage in a fresh process (so peak RSS is its own), its output goes to log."""
+    result_file = Path(project_dir) / f"bench_{name}.json"
+    result_file.unlink(missing_ok=True)
+    command = [sys.executable, str(Path(__file__).resolve()), "--run-stage", name, "--project-dir", str(project_dir),
+               "--config", json.dumps(config), "--result-file", str(result_file)]
+    env = dict(os.environ)
+    metrics_file = Path(project_dir) / f"bench_{name}.metrics.jsonl"
+    if config["metrics"]:
+        env[METRICS_ENV] = str(metrics_file)
+    start = time.perf_counter()
+    completed = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, cwd=ROOT, env=env)
+    if completed.returncode != 0 or not result_file.exists():
+        return {"seconds": round(time.perf_counter() - start, 3), "error": f"exit code {completed.returncode}"}
+    result = json.loads(result_file.read_text(encoding="utf-8"))
+    if config["metrics"] and metrics_file.exists():
+        with open(metrics_file, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+        result["metrics"] = {event["stage"]: {key: event[key] for key in ("seconds", "timers", "counters",
+                                                                          "histograms")}
+                             for event in events if event["event"] == "stage"}
+    return result
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def append_result(results_file, run):
+    results_file = Path(results_file)
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+    runs = json.loads(results_file.read_text(encoding="utf-8")) if results_file.exists() else []
+    runs.append(run)
+    results_file.write_text(json.dumps(runs, indent=1), encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark on a synthetic corpus")
+    parser.add_argument("--articles", type=int, default=10000)
+    parser.add_argument("--source", choices=["api", "files"], default="api",
+                        help="collect from the stub server, or write .txt article files")
+    parser.add_argument("--stages", nargs="*", choices=STAGES, default=STAGES)
+    parser.add_argument("--work-dir", type=Path, default=os.environ.get("BENCH_WORK_DIR"))
+    parser.add_argument("--results", type=Path, default=os.environ.get("BENCH_RESULTS", RESULTS_FILE))
+    parser.add_argument("--keep", action="store_true", help="keep the work directory")
+    parser.add_argument("--rate", type=float, help="requests/s per API key (default: data_collection's)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--text-mode", choices=["tfidf", "hashing"], default="tfidf")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--metrics", action="store_true", help="store the stages' metrics.py output too")
+    # Internal: run one stage in this process
+    parser.add_argument("--run-stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--project-dir", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        return run_stage_here(args.run_stage, args.project_dir, json.loads(args.config), args.result_file)
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    if work_dir.exists() and any(work_dir.iterdir()):
+        # A benchmark measures a cold run: no crawl state, caches or earlier outputs.
+        # Only a directory an earlier benchmark left behind is emptied
+        if not (work_dir / "bench.log").exists():
+            parser.error(f"{work_dir} is not empty and not a benchmark work directory")
+        shutil.rmtree(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    per_section = -(-args.articles // len(CATEGORIES))
+    server, base_url = start_in_background(articles_per_section=per_section, seed=args.seed)
+    config = {"base_url": base_url, "per_section": per_section, "rate": args.rate, "workers": args.workers,
+              "text_mode": args.text_mode, "seed": args.seed, "metrics": args.metrics}
+    skipped = "files" if args.source == "api" else "collect"
+    stages = [s for s in STAGES if s in args.stages and s != skipped]
+
+    print(f"Synthetic pipeline run: {per_section * len(CATEGORIES)} articles ({args.source}) in {work_dir}")
+    results = {}
+    try:
+        with open(work_dir / "bench.log", "w", encoding="utf-8") as log:
+            print(f"\n{'STAGE':<10} | {'seconds':>8} | {'items':>8} | {'items/s':>9} | {'peak RSS MB':>11}")
+            print("-" * 58)
+            for name in stages:
+                result = run_stage(name, work_dir, config, log)
+                results[name] = result
+                if "error" in result:
+                    print(f"{name:<10} | {result['seconds']:>8.1f} | failed ({result['error']}), "
+                          f"see {work_dir / 'bench.log'}")
+                    break
+                print(f"{name:<10} | {result['seconds']:>8.1f} | {result['items']:>8} | "
+                      f"{result['items_per_second']:>9.0f} | {result['peak_rss_mb'] or '-':>11}")
+    finally:
+        server.shutdown()
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    run = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "articles": per_section * len(CATEGORIES),
+        "source": args.source,
+        "text_mode": args.text_mode,
+        "workers": args.workers,
+        "rate": args.rate,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "stages": results,
+    }
+    append_result(args.results, run)
+    print(f"\nResults appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from data_collection import create_article_record
+from sensing import record_to_row
+from synthetic_corpus import SECTIONS, make_api_article
+from text_cleaning import clean_text_batch
+
+# Time and peak memory (tracemalloc) of combining the trail / tag / author
+# blocks of feature_extraction_2: toarray + pd.concat (before) vs one
+# scipy.sparse CSR matrix (after), at the current vocabulary sizes and x10.
+
+TRAIL_FEATURES = 1000
+TAG_FEATURES = 500
+
+
+def make_frame(n_rows):
+    per_section = n_rows // len(SECTIONS)
+    rows = [{"label": section, **record_to_row(create_article_record(make_api_article(section, i)))}
+            for section in SECTIONS for i in range(per_section)]
+    df = pd.DataFrame(rows)
+    for col in ['trail_text', 'tags']:
+        df[col] = clean_text_batch(df[col])
+    df['author'] = df['author'].str.lower()
+    return df
+
+
+def author_block(df):
+    authors = sorted(df['author'].unique())
+    codes = pd.Categorical(df['author'], categories=authors).codes
+    X = sparse.csr_matrix((np.ones(len(df), dtype=np.int64), (np.arange(len(df)), codes)),
+                          shape=(len(df), len(authors)))
+    return X, [f"auth_{a.replace(' ', '_')}" for a in authors]
+
+
+def dense_path(X_trail, trail_columns, X_tags, tags_columns, X_authors, author_columns, labels):
+    final = pd.concat([pd.DataFrame(X_trail.toarray(), columns=trail_columns),
+                       pd.DataFrame(X_tags.toarray(), columns=tags_columns),
+                       pd.DataFrame(X_authors.toarray(), columns=author_columns)], axis=1)
+    final['label'] = labels
+    return final.shape
+
+
+def sparse_path(X_trail, trail_columns, X_tags, tags_columns, X_authors, author_columns, labels):
+    X = sparse.hstack([X_trail, X_tags, X_authors], format='csr')
+    columns = trail_columns + tags_columns + author_columns
+    return X.shape[0], len(columns) + 1
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    shape = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return shape, elapsed, peak / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10])
+    args = parser.parse_args()
+
+    print(f"Building {args.rows} synthetic processed rows...")
+    df = make_frame(args.rows)
+    labels = df['label'].to_numpy()
+    X_authors, author_columns = author_block(df)
+
+    print(f"\n{'VOCAB':>12} | {'PATH':<6} | {'SHAPE':>15} | {'SECONDS':>8} | {'PEAK MB':>9}")
+    print("-" * 62)
+    for scale in args.scales:
+        trail_vectorizer = TfidfVectorizer(max_features=TRAIL_FEATURES * scale)
+        X_trail = trail_vectorizer.fit_transform(df['trail_text'])
+        tags_vectorizer = TfidfVectorizer(max_features=TAG_FEATURES * scale)
+        X_tags = tags_vectorizer.fit_transform(df['tags'])
+        blocks = (X_trail, [f"trail_{w}" for w in trail_vectorizer.get_feature_names_out()],
+                  X_tags, [f"tag_{w}" for w in tags_vectorizer.get_feature_names_out()],
+                  X_authors, author_columns, labels)
+
+        vocab = f"{X_trail.shape[1]}+{X_tags.shape[1]}"
+        for name, fn in [("dense", dense_path), ("sparse", sparse_path)]:
+            shape, elapsed, peak = measure(fn, *blocks)
+            print(f"{vocab:>12} | {name:<6} | {str(shape):>15} | {elapsed:>8.2f} | {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
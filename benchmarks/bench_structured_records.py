@@ -0,0 +1,96 @@
+import argparse
+import contextlib
+import csv
+import io
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import sensing
+from corpus_store import CorpusStore
+from data_collection import create_article_content, create_article_record
+from synthetic_corpus import SECTIONS, make_api_article
+
+# Collection (API JSON -> disk, no HTTP) + sensing (disk -> sensed CSV):
+#   text    - create_article_content, one .txt per article, line-positional parse
+#   records - create_article_record appended to the corpus store, read back as is
+
+
+def make_pages(n_articles, page_size=50):
+    per_section = n_articles // len(SECTIONS)
+    pages = []
+    for section in SECTIONS:
+        for start in range(0, per_section, page_size):
+            pages.append((section, [make_api_article(section, i) for i in range(start, min(per_section, start + page_size))]))
+    return pages
+
+
+def collect_text(pages, data_dir):
+    for section, results in pages:
+        output_dir = data_dir / section
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for article in results:
+            content = create_article_content(article)
+            if content:
+                (output_dir / f"{article['id'].replace('/', '_')}.txt").write_text(content, encoding="utf-8")
+
+
+def collect_records(pages, corpus_dir):
+    store = CorpusStore(corpus_dir)
+    for section, results in pages:
+        store.append(section, [r for r in map(create_article_record, results) if r])
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return sorted(tuple(row.items()) for row in csv.DictReader(f))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"Generating {args.articles} synthetic API results...")
+    pages = make_pages(args.articles)
+    n = sum(len(results) for _, results in pages)
+
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        text_dir, store_dir = tmp / "text", tmp / "store"
+        text_dir.mkdir()
+
+        timings = {
+            "text": (timed(collect_text, pages, text_dir),
+                     timed(sensing.main, text_dir, tmp / "no-store", tmp / "text.csv")),
+            "records": (timed(collect_records, pages, store_dir),
+                        timed(sensing.main, text_dir, store_dir, tmp / "records.csv")),
+        }
+
+        same = read_rows(tmp / "text.csv") == read_rows(tmp / "records.csv")
+        print(f"Sensed CSVs identical: {same}")
+
+        print(f"\n{'PATH':<8} | {'COLLECT s':>9} | {'SENSE s':>8} | {'TOTAL s':>8} | {'ARTICLES/s':>10}")
+        print("-" * 56)
+        for path, (collect, sense) in timings.items():
+            print(f"{path:<8} | {collect:>9.2f} | {sense:>8.2f} | {collect + sense:>8.2f} | {n / (collect + sense):>10.0f}")
+
+        text_total, records_total = sum(timings["text"]), sum(timings["records"])
+        print(f"\nEnd-to-end speedup: {text_total / records_total:.2f}x on {n} articles")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+from data_collection import create_article_record
+from sensing import record_to_row
+from synthetic_corpus import SECTIONS, make_api_article
+from text_cleaning import clean_text_batch, clean_text_noise
+
+# Rows/sec of the Pre-Processing text columns:
+# df[col].apply(clean_text_noise) (before) vs clean_text_batch (after),
+# checking the outputs are identical.
+
+TEXT_COLUMNS = ['title', 'trail_text', 'tags', 'body']
+
+
+def make_frame(n_rows):
+    per_section = n_rows // len(SECTIONS)
+    rows = [record_to_row(create_article_record(make_api_article(section, i)))
+            for section in SECTIONS for i in range(per_section)]
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"Building {args.rows} synthetic sensed rows...")
+    df = make_frame(args.rows)
+    n = len(df)
+
+    variants = {
+        "apply": lambda col: df[col].apply(clean_text_noise),
+        "batch": lambda col: clean_text_batch(df[col]),
+        f"batch x{args.workers}": lambda col: clean_text_batch(df[col], workers=args.workers),
+    }
+
+    print(f"\n{'COLUMN':<11} | " + " | ".join(f"{name + ' rows/s':>18}" for name in variants) + " | IDENTICAL")
+    print("-" * (16 + 21 * len(variants) + 9))
+    totals = dict.fromkeys(variants, 0.0)
+    for col in TEXT_COLUMNS:
+        outputs = {}
+        for name, run in variants.items():
+            start = time.perf_counter()
+            outputs[name] = run(col)
+            totals[name] += time.perf_counter() - start
+            outputs[name + "_time"] = time.perf_counter() - start
+
+        baseline = outputs["apply"].tolist()
+        identical = all(outputs[name].tolist() == baseline for name in variants)
+        print(f"{col:<11} | " + " | ".join(f"{n / outputs[name + '_time']:>18.0f}" for name in variants)
+              + f" | {identical}")
+
+    print(f"{'all 4':<11} | " + " | ".join(f"{n / totals[name]:>18.0f}" for name in variants))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import hashlib
+import sqlite3
+
+# Persistent cache of clean_text_noise results, so a rerun of the preprocessing
+# only cleans text it has not seen before.
+#   entries - blake2b(raw text) -> cleaned text, with its size and last use
+#   meta    - the stopword version the entries were cleaned with, the use counter,
+#             and the total size of the entries (kept up to date by triggers, so the
+#             eviction check does not have to sum the whole table on every write)
+# When the stopword set changes every entry is stale, so the cache empties itself.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    cleaned TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS entries_added AFTER INSERT ON entries BEGIN
+    UPDATE meta SET value = CAST(value AS INTEGER) + NEW.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_removed AFTER DELETE ON entries BEGIN
+    UPDATE meta SET value = CAST(value AS INTEGER) - OLD.size WHERE name = 'bytes';
+END;
+"""
+
+# SQLite limits the number of ? in one statement
+QUERY_BATCH = 900
+
+
+def text_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def stop_words_version(stop_words):
+    return hashlib.blake2b("\n".join(sorted(stop_words)).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CleanCache:
+    """
+    SQLite cache with least-recently-used eviction once the cleaned text
+    stored goes over max_bytes. hits / misses / evictions count this session.
+    """
+
+    def __init__(self, path, max_bytes=1024 ** 3):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # INSERT OR REPLACE only fires the delete trigger for the replaced row with this on
+        self.conn.execute("PRAGMA recursive_triggers=ON")
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            # A cache from before the running total: counted once
+            self.conn.execute("INSERT OR IGNORE INTO meta (name, value) "
+                              "SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries")
+        self.version = self._meta("stop_words_version")
+        self.tick = int(self._meta("tick") or 0)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _meta(self, name):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, str(value)))
+
+    def use_stop_words(self, stop_words):
+        """Empties the cache if it was filled with a different stopword set."""
+        version = stop_words_version(stop_words)
+        if version != self.version:
+            with self.conn:
+                self.conn.execute("DELETE FROM entries")
+                self._set_meta("stop_words_version", version)
+            self.version = version
+
+    def get_many(self, keys):
+        """{key: cleaned} for the keys that are cached; marks them as recently used."""
+        self.tick += 1
+        found = {}
+        for i in range(0, len(keys), QUERY_BATCH):
+            batch = keys[i:i + QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self.conn.execute(
+                f"SELECT key, cleaned FROM entries WHERE key IN ({placeholders})", batch))
+
+        hit_keys = list(found)
+        with self.conn:
+            for i in range(0, len(hit_keys), QUERY_BATCH):
+                batch = hit_keys[i:i + QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                self.conn.execute(f"UPDATE entries SET last_used = ? WHERE key IN ({placeholders})",
+                                  [self.tick, *batch])
+            self._set_meta("tick", self.tick)
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Stores (key, cleaned) pairs, then evicts the least recently used entries over max_bytes."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, cleaned, size, last_used) VALUES (?, ?, ?, ?)",
+                [(key, cleaned, len(cleaned), self.tick) for key, cleaned in items])
+            self._evict()
+
+    def _evict(self):
+        total = int(self._meta("bytes"))
+        if total <= self.max_bytes:
+            return
+        # Oldest first until we are back under the limit
+        to_free = total - self.max_bytes
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            doomed.append((key,))
+            to_free -= size
+            if to_free <= 0:
+                break
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def stats(self):
+        looked_up = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / looked_up if looked_up else 0.0,
+            "evictions": self.evictions,
+            "entries": self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+        }
@@ -0,0 +1,213 @@
+import argparse
+import gzip
+import json
+import threading
+from pathlib import Path
+
+import metrics
+
+# Sharded article store, replacing one small .txt file per article.
+#
+# Layout under the store root:
+#   <category>/shard-00000.jsonl.gz   - JSON lines, one structured article record per line
+#                                       (see data_collection.create_article_record)
+#   index.tsv                         - id, category, shard, member offset, line in member
+#
+# Every append() writes one gzip member (a page of articles) to the end of the
+# current shard. Concatenated members are still a valid .gz file, so a shard
+# can be streamed with gzip.open, and a single article can be read back by
+# seeking to its member offset without decompressing the whole shard.
+
+SHARD_MAX_BYTES = 64 * 1024 * 1024
+# Level 4 writes ~2x faster than the default 9 for ~15% larger shards
+COMPRESS_LEVEL = 4
+INDEX_FILE = "index.tsv"
+
+
+class CorpusStore:
+    """Append-only article store. append() is safe to call from several threads."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / INDEX_FILE
+        self.lock = threading.Lock()
+        self.index = {}
+        self._load_index()
+
+    def _load_index(self):
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) == 5:
+                    article_id, category, shard, offset, position = parts
+                    self.index[article_id] = (category, shard, int(offset), int(position))
+
+    def __contains__(self, article_id):
+        return article_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def categories(self):
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def shards(self, category=None):
+        categories = [category] if category else self.categories()
+        return [shard for c in categories for shard in sorted((self.root / c).glob("shard-*.jsonl.gz"))]
+
+    def _current_shard(self, category):
+        category_dir = self.root / category
+        category_dir.mkdir(parents=True, exist_ok=True)
+        existing = sorted(category_dir.glob("shard-*.jsonl.gz"))
+        if existing and existing[-1].stat().st_size < SHARD_MAX_BYTES:
+            return existing[-1]
+        return category_dir / f"shard-{len(existing):05d}.jsonl.gz"
+
+    def append(self, category, records):
+        """
+        Appends records (dicts with an "id") to the category's current shard.
+        Records whose id is already stored are dropped. Returns the ids written.
+        """
+        with self.lock:
+            new_records = []
+            seen = set()
+            for record in records:
+                if record["id"] not in self.index and record["id"] not in seen:
+                    seen.add(record["id"])
+                    new_records.append(record)
+            if not new_records:
+                return []
+
+            payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in new_records)
+            shard = self._current_shard(category)
+            with open(shard, "ab") as f:
+                offset = f.tell()
+                compressed = gzip.compress(payload.encode("utf-8"), compresslevel=COMPRESS_LEVEL)
+                f.write(compressed)
+            metrics.count("corpus.bytes_written", len(compressed))
+
+            shard_name = shard.name
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                for position, record in enumerate(new_records):
+                    self.index[record["id"]] = (category, shard_name, offset, position)
+                    f.write(f"{record['id']}\t{category}\t{shard_name}\t{offset}\t{position}\n")
+
+            return [r["id"] for r in new_records]
+
+    def get(self, article_id):
+        """Random access to one record through the offset index."""
+        category, shard_name, offset, position = self.index[article_id]
+        with open(self.root / category / shard_name, "rb") as f:
+            f.seek(offset)
+            # GzipFile would carry on into the following members, we stop at our line
+            with gzip.GzipFile(fileobj=f) as member:
+                for i, line in enumerate(member):
+                    if i == position:
+                        return json.loads(line)
+        raise KeyError(article_id)
+
+    def member_ranges(self, max_records, min_offsets=None):
+        """
+        Splits the shards into byte ranges of whole gzip members holding about
+        max_records records each: (category, shard path, start, end), in
+        iter_records order. Each range can be read independently with read_range.
+        min_offsets ({shard path as str: offset}) skips members before that offset.
+        """
+        min_offsets = min_offsets or {}
+        members = {}
+        for category, shard_name, offset, _ in self.index.values():
+            key = (category, shard_name, offset)
+            members[key] = members.get(key, 0) + 1
+
+        ranges = []
+        by_shard = {}
+        for (category, shard_name, offset), count in sorted(members.items()):
+            by_shard.setdefault((category, shard_name), []).append((offset, count))
+
+        for (category, shard_name), shard_members in sorted(by_shard.items()):
+            shard = self.root / category / shard_name
+            size = shard.stat().st_size
+            shard_members = [m for m in shard_members if m[0] >= min_offsets.get(str(shard), 0)]
+            if not shard_members:
+                continue
+            start, records = shard_members[0][0], 0
+            for i, (offset, count) in enumerate(shard_members):
+                records += count
+                end = shard_members[i + 1][0] if i + 1 < len(shard_members) else size
+                if records >= max_records or end == size:
+                    ranges.append((category, shard, start, end))
+                    start, records = end, 0
+        return ranges
+
+    def iter_records(self, category=None):
+        """Streams (category, record) over every shard, one shard open at a time."""
+        for shard in self.shards(category):
+            with gzip.open(shard, "rt", encoding="utf-8") as f:
+                for line in f:
+                    yield shard.parent.name, json.loads(line)
+
+
+@metrics.timed("corpus.read_range")
+def read_range(shard, start, end):
+    """Decompresses the gzip members in [start, end) of a shard into records."""
+    with open(shard, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    metrics.count("corpus.bytes_read", len(data))
+    return [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines()]
+
+
+def migrate_text_tree(data_dir, store_root, batch_size=500):
+    """
+    Migration of a data/<category>/*.txt tree into a CorpusStore.
+    Each file is parsed once by the legacy text parser into a structured record,
+    the id is the file name. Files whose id is already stored are skipped without
+    being read, so running it again only imports the new ones.
+    Returns the number of articles added.
+    """
+    # The line-positional parser now only serves this import path
+    from sensing import parse_article_text
+
+    store = CorpusStore(store_root)
+    added = 0
+    for category_dir in sorted(Path(data_dir).iterdir()):
+        if not category_dir.is_dir() or category_dir.resolve() == store.root.resolve():
+            continue
+        batch = []
+        added_before = added
+        for file_path in sorted(category_dir.glob("*.txt")):
+            if file_path.stem in store:
+                continue
+            content = file_path.read_text(encoding="utf-8")
+            row = parse_article_text(content)
+            if row is None:
+                continue
+            header_parts = content.split("\n", 1)[0].split("|")
+            row["section"] = header_parts[1].strip() if len(header_parts) >= 3 else category_dir.name
+            row["tags"] = row["tags"].split(", ") if row["tags"] else []
+            batch.append({"id": file_path.stem, **row})
+            if len(batch) >= batch_size:
+                added += len(store.append(category_dir.name, batch))
+                batch = []
+        if batch:
+            added += len(store.append(category_dir.name, batch))
+        if added > added_before:
+            print(f"Migrated {added - added_before} articles of {category_dir.name}")
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate a data/<category>/*.txt tree into a sharded corpus store")
+    parser.add_argument("data_dir", type=Path)
+    parser.add_argument("store_dir", type=Path)
+    args = parser.parse_args()
+
+    added = migrate_text_tree(args.data_dir, args.store_dir)
+    print(f"Done. {added} articles added to {args.store_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+# On-disk state of the Guardian crawl, so a restarted data_collection run
+# continues exactly where the previous one stopped:
+#   articles  - index of every article id already saved
+#   rejected  - ids create_article_record turned down (no body, corrections...),
+#               so they count as seen and are not processed again
+#   cursors   - next page to hand out per category
+#   pending   - pages that were handed out but never finished (or failed)
+#   key_usage - requests per API key per day, and whether the key hit 429
+#   watermarks - newest webPublicationDate seen per category (incremental mode)
+#   shards    - date windows already fully fetched (backfill mode)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    category TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rejected (
+    id TEXT PRIMARY KEY,
+    category TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    category TEXT PRIMARY KEY,
+    next_page INTEGER NOT NULL,
+    exhausted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS pending (
+    category TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    PRIMARY KEY (category, page)
+);
+CREATE TABLE IF NOT EXISTS key_usage (
+    api_key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    exhausted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (api_key, day)
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    category TEXT PRIMARY KEY,
+    newest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    category TEXT NOT NULL,
+    from_date TEXT NOT NULL,
+    to_date TEXT NOT NULL,
+    saved INTEGER NOT NULL,
+    PRIMARY KEY (category, from_date, to_date)
+);
+"""
+
+
+def today():
+    # The Guardian quota resets daily, we count days in UTC
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class CrawlState:
+    """
+    SQLite-backed crawl checkpoint. All methods are safe to call from the
+    collector's worker threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- article index ---
+
+    def article_count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def known_ids(self, article_ids):
+        """Returns the subset of article_ids that was seen before (saved or rejected)."""
+        article_ids = list(article_ids)
+        if not article_ids:
+            return set()
+        placeholders = ",".join("?" * len(article_ids))
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id FROM articles WHERE id IN ({placeholders}) "
+                f"UNION SELECT id FROM rejected WHERE id IN ({placeholders})", article_ids * 2).fetchall()
+        return {row[0] for row in rows}
+
+    def add_rejected(self, category, article_ids):
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO rejected (id, category) VALUES (?, ?)",
+                                  [(article_id, category) for article_id in article_ids])
+
+    def add_articles(self, category, article_ids):
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO articles (id, category) VALUES (?, ?)",
+                                  [(article_id, category) for article_id in article_ids])
+
+    def index_existing_files(self, output_root):
+        """One-off bootstrap from an existing data/<category>/*.txt tree."""
+        added = 0
+        if not output_root.exists():
+            return added
+        for category_dir in output_root.iterdir():
+            if category_dir.is_dir():
+                # file names are article ids with '/' replaced by '_'
+                ids = [p.stem for p in category_dir.glob("*.txt")]
+                self.add_articles(category_dir.name, ids)
+                added += len(ids)
+        return added
+
+    # --- page cursors ---
+
+    def load_cursors(self, categories):
+        """Returns ({category: next_page}, {category: [pending pages]}, {exhausted categories})."""
+        with self.lock:
+            rows = dict(((c, (p, e)) for c, p, e in
+                         self.conn.execute("SELECT category, next_page, exhausted FROM cursors")))
+            pending_rows = self.conn.execute("SELECT category, page FROM pending ORDER BY page").fetchall()
+
+        next_page = {c: rows.get(c, (1, 0))[0] for c in categories}
+        exhausted = {c for c in categories if rows.get(c, (1, 0))[1]}
+        pending = {c: [] for c in categories}
+        for category, page in pending_rows:
+            if category in pending:
+                pending[category].append(page)
+        return next_page, pending, exhausted
+
+    def start_page(self, category, page, next_page):
+        """Marks a page as in flight, so a crash before it finishes re-fetches it."""
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO pending (category, page) VALUES (?, ?)", (category, page))
+            self.conn.execute(
+                "INSERT INTO cursors (category, next_page) VALUES (?, ?) "
+                "ON CONFLICT(category) DO UPDATE SET next_page = MAX(next_page, excluded.next_page)",
+                (category, next_page))
+
+    def finish_page(self, category, page, article_ids):
+        """Indexes the page's articles and clears it from pending, in one transaction."""
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO articles (id, category) VALUES (?, ?)",
+                                  [(article_id, category) for article_id in article_ids])
+            self.conn.execute("DELETE FROM pending WHERE category = ? AND page = ?", (category, page))
+
+    def mark_exhausted(self, category, page):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM pending WHERE category = ? AND page >= ?", (category, page))
+            self.conn.execute(
+                "INSERT INTO cursors (category, next_page, exhausted) VALUES (?, ?, 1) "
+                "ON CONFLICT(category) DO UPDATE SET exhausted = 1", (category, page))
+
+    # --- API key quota ---
+
+    def count_request(self, api_key):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO key_usage (api_key, day, requests) VALUES (?, ?, 1) "
+                "ON CONFLICT(api_key, day) DO UPDATE SET requests = requests + 1", (api_key, today()))
+
+    def mark_key_exhausted(self, api_key):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO key_usage (api_key, day, exhausted) VALUES (?, ?, 1) "
+                "ON CONFLICT(api_key, day) DO UPDATE SET exhausted = 1", (api_key, today()))
+
+    def key_usage(self, api_key):
+        """Returns (requests today, exhausted today)."""
+        with self.lock:
+            row = self.conn.execute("SELECT requests, exhausted FROM key_usage WHERE api_key = ? AND day = ?",
+                                    (api_key, today())).fetchone()
+        return (row[0], bool(row[1])) if row else (0, False)
+
+    # --- date windows ---
+
+    def watermark(self, category):
+        """Newest webPublicationDate saved for the category, or None."""
+        with self.lock:
+            row = self.conn.execute("SELECT newest FROM watermarks WHERE category = ?", (category,)).fetchone()
+        return row[0] if row else None
+
+    def update_watermark(self, category, newest):
+        # ISO timestamps compare correctly as strings
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO watermarks (category, newest) VALUES (?, ?) "
+                "ON CONFLICT(category) DO UPDATE SET newest = MAX(newest, excluded.newest)",
+                (category, newest))
+
+    def done_shards(self, category):
+        with self.lock:
+            rows = self.conn.execute("SELECT from_date, to_date FROM shards WHERE category = ?",
+                                     (category,)).fetchall()
+        return set(rows)
+
+    def finish_shard(self, category, from_date, to_date, saved):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO shards (category, from_date, to_date, saved) "
+                              "VALUES (?, ?, ?, ?)", (category, from_date, to_date, saved))
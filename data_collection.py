@@ -1,7 +1,16 @@
 import requests
 import re
+import threading
 import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+
+import metrics
+from corpus_store import CorpusStore, migrate_text_tree
+from crawl_state import CrawlState
 
 # --- Configuration ---
 
@@ -26,6 +35,25 @@ TARGET_PER_CATEGORY = int(TARGET_NEW_ARTICLES_PER_KEY / len(CATEGORIES))
 
 PAGE_SIZE = 50
 
+# Every (key, category) pair gets its own worker, all sharing one pooled session
+MAX_WORKERS = len(API_KEYS) * len(CATEGORIES)
+
+# Replaces the fixed time.sleep(0.3): each key may burst a little, then is held to this rate
+REQUESTS_PER_SECOND_PER_KEY = 3
+REQUEST_TIMEOUT = 30
+
+# Seen-article index, page cursors and quota usage, kept between runs (see crawl_state.py)
+CRAWL_STATE_FILE = "crawl_state.sqlite"
+
+# Articles are appended to compressed shards here instead of one .txt per article (see corpus_store.py)
+CORPUS_DIR_NAME = "corpus"
+
+# Date-window modes (see run_incremental / run_backfill)
+# Without a saved watermark, incremental mode looks this many days back
+INCREMENTAL_FIRST_RUN_DAYS = 7
+# Backfill splits the requested history into windows of this many days per category
+BACKFILL_SHARD_DAYS = 7
+
 
 def clean_html(raw_html):
     if not raw_html:
@@ -34,7 +62,11 @@ def clean_html(raw_html):
     return re.sub(cleanr, '', raw_html).strip()
 
 
-def create_article_content(article):
+def create_article_record(article):
+    """
+    The fields we keep from one API result, as a structured record.
+    This is what the collector stores and what sensing reads back, no text round-trip.
+    """
     fields = article.get("fields", {})
     body = (fields.get("bodyText") or "").strip()
 
@@ -55,123 +87,554 @@ def create_article_content(article):
 
     trail_text = clean_html(fields.get("trailText", ""))
     tags_names = [t.get('webTitle') for t in article.get("tags", [])]
-    tags_str = ", ".join(tags_names)
+
+    return {
+        "id": article["id"].replace("/", "_"),
+        "section": section,
+        "date": date,
+        "author": byline,
+        "url": url,
+        "tags": tags_names,
+        "title": title,
+        "trail_text": trail_text,
+        "body": body,
+    }
+
+
+def create_article_content(article):
+    """The old line-positional text format (one .txt per article), kept for export."""
+    record = create_article_record(article)
+    if record is None:
+        return None
+
+    tags_str = ", ".join(record["tags"])
 
     return (
-        f"The Guardian | {section} | {date}\n"
-        f"By {byline}\n"
-        f"{url}\n"
+        f"The Guardian | {record['section']} | {record['date']}\n"
+        f"By {record['author']}\n"
+        f"{record['url']}\n"
         f"Tags: {tags_str}\n"
         f"\n"
-        f"{title}\n"
+        f"{record['title']}\n"
         f"{'-' * 20}\n"
-        f"{trail_text}\n"
+        f"{record['trail_text']}\n"
         f"{'-' * 60}\n"
-        f"{body}\n"
+        f"{record['body']}\n"
     )
 
 
-def main():
-    print(f"Fetching data to: {PROJECT_DIR}")
-    PROJECT_DIR.mkdir(parents=True, exist_ok=True)
-
+class TokenBucket:
+    """
+    Per-key rate limiter: `rate` tokens are added every second, up to `capacity`.
+    Every request takes one token and waits when the bucket is empty.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    @metrics.timed("http.rate_limit_wait")
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class PageCursor:
+    """
+    The shared category_page_cursor, made safe for concurrent workers.
+    A page is handed out to exactly one key; pages that failed are handed out again first.
+    With a CrawlState every move is checkpointed, so a restarted run resumes at the same pages;
+    resume=False starts from page 1 and leaves the checkpointed cursors untouched.
+    Once a response told the page count (set_pages), pages past it are not handed out
+    and the category is exhausted.
+    """
+
+    def __init__(self, categories, state=None, resume=True):
+        self.state = state
+        self.checkpoint = state is not None and resume
+        self.lock = threading.Lock()
+        if self.checkpoint:
+            self.next_page, self.returned, self.exhausted = state.load_cursors(categories)
+        else:
+            self.next_page = {category: 1 for category in categories}
+            self.returned = {category: [] for category in categories}
+            self.exhausted = set()
+        self.pages = {}
+
+    def claim(self, category):
+        with self.lock:
+            if category in self.exhausted:
+                return None
+            if self.returned[category]:
+                return self.returned[category].pop(0)
+            page = self.next_page[category]
+            if category in self.pages and page > self.pages[category]:
+                # The API answers a page past the last one with 400, not an empty page
+                self.exhausted.add(category)
+                if self.checkpoint:
+                    self.state.mark_exhausted(category, page)
+                return None
+            self.next_page[category] += 1
+            if self.checkpoint:
+                self.state.start_page(category, page, self.next_page[category])
+            return page
+
+    def give_back(self, category, page):
+        # The request failed, so another key should try this page again
+        with self.lock:
+            self.returned[category].append(page)
+            self.returned[category].sort()
+
+    def finish(self, category, page, article_ids):
+        if self.checkpoint:
+            self.state.finish_page(category, page, article_ids)
+        elif self.state is not None:
+            self.state.add_articles(category, article_ids)
+
+    def set_pages(self, category, pages):
+        """The page count of the category, from response["pages"]."""
+        with self.lock:
+            self.pages[category] = pages
+
+    def mark_exhausted(self, category, page):
+        with self.lock:
+            self.exhausted.add(category)
+            if self.checkpoint:
+                self.state.mark_exhausted(category, page)
+
+
+class KeyPool:
+    """
+    Round-robins requests over the API keys that still have quota,
+    each key keeping its own token bucket.
+    """
+
+    def __init__(self, api_keys, state=None):
+        self.api_keys = list(api_keys)
+        self.limiters = [TokenBucket(REQUESTS_PER_SECOND_PER_KEY) for _ in self.api_keys]
+        self.exhausted = set()
+        self.turn = 0
+        self.lock = threading.Lock()
+        if state is not None:
+            for key_index, api_key in enumerate(self.api_keys):
+                if state.key_usage(api_key)[1]:
+                    print(f"Key #{key_index + 1} already hit its quota today, skipping.")
+                    self.exhausted.add(key_index)
+
+    def acquire(self):
+        """Returns the index of the key to use next (after waiting for its rate limit), or None."""
+        with self.lock:
+            available = [i for i in range(len(self.api_keys)) if i not in self.exhausted]
+            if not available:
+                return None
+            key_index = available[self.turn % len(available)]
+            self.turn += 1
+        self.limiters[key_index].acquire()
+        return key_index
+
+    def mark_exhausted(self, key_index):
+        with self.lock:
+            self.exhausted.add(key_index)
+
+
+def create_session(pool_size):
+    """One keep-alive session for all workers, with a connection per worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_page(session, base_url, params, key_index):
+    """session.get of one search page, with its latency, size and a 429 per key counted in metrics."""
+    start = time.perf_counter()
+    resp = session.get(base_url, params=params, timeout=REQUEST_TIMEOUT)
+    metrics.observe("http.request_seconds", time.perf_counter() - start)
+    metrics.count("http.requests")
+    metrics.count("http.bytes_read", len(resp.content))
+    if resp.status_code == 429:
+        metrics.count(f"http.429.key_{key_index + 1}")
+    return resp
+
+
+def is_past_last_page(resp):
+    """Whether a 400 response is the API's answer to a page number past the last page."""
+    try:
+        message = resp.json()["response"].get("message", "")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return False
+    return "beyond the number of available pages" in message
+
+
+def api_section_for(category):
+    clean_category = category.lower()
+    return 'commentisfree' if clean_category == 'opinion' else clean_category
+
+
+@metrics.timed("collect.save_articles")
+def save_articles(results, store, category, state=None):
+    """
+    Appends new articles to the corpus store, returns (saved, skipped, ids of every article now stored).
+    skipped counts every article seen before, saved or rejected; the ids create_article_record
+    rejects are recorded in the crawl state, so on the next visit they are skipped as well.
+    """
+    skipped_count = 0
+    records = []
+    rejected_ids = []
+
+    article_ids = [article["id"].replace("/", "_") for article in results]
+    known = state.known_ids(article_ids) if state is not None else set()
+
+    for article_id, article in zip(article_ids, results):
+        # --- CRITICAL CHANGE: SKIP IF EXISTS ---
+        # The crawl index and the store index answer this without touching the disk
+        if article_id in known or article_id in store:
+            skipped_count += 1
+            continue  # Skip to next article, don't save, don't count
+
+        # Process Content
+        record = create_article_record(article)
+        if record:
+            records.append(record)
+        else:
+            rejected_ids.append(article_id)
+
+    if rejected_ids and state is not None:
+        state.add_rejected(category, rejected_ids)
+    # The store drops anything another worker saved in the meantime
+    written = store.append(category, records)
+    skipped_count += len(records) - len(written)
+    stored_ids = [article_id for article_id in article_ids if article_id in store]
+
+    return len(written), skipped_count, stored_ids
+
+
+def collect_category(session, base_url, key_index, api_key, category, cursor, limiter,
+                     quota_exhausted, store, state=None, stop_on_known=False):
+    """
+    Worker for one (key, category) pair: keeps claiming pages from the shared
+    cursor until this key collected TARGET_PER_CATEGORY new articles.
+    With stop_on_known, the category ends at the first page made only of known articles.
+    """
+    api_section = api_section_for(category)
+    prefix = f"[Key #{key_index + 1} | {category}]"
+
+    category_new_collected = 0
+
+    # loop until we find enough NEW articles for this category
+    while category_new_collected < TARGET_PER_CATEGORY and not quota_exhausted.is_set():
+        current_page = cursor.claim(category)
+        if current_page is None:
+            break
+
+        params = {
+            "api-key": api_key,
+            "page-size": PAGE_SIZE,
+            "page": current_page,
+            "section": api_section,
+            "order-by": "newest",
+            "show-fields": "headline,byline,bodyText,trailText",
+            "show-tags": "all"
+        }
+
+        limiter.acquire()
+        try:
+            resp = get_page(session, base_url, params, key_index)
+            if state is not None:
+                state.count_request(api_key)
+
+            # Handle Quota Limit (429): stop every worker of this key
+            if resp.status_code == 429:
+                print(f"!! {prefix} Quota exceeded. Stopping this key...")
+                cursor.give_back(category, current_page)
+                quota_exhausted.set()
+                if state is not None:
+                    state.mark_key_exhausted(api_key)
+                break
+
+            # A page past the last one is a 400, not an empty page: the category is done
+            if resp.status_code == 400 and is_past_last_page(resp):
+                print(f"{prefix} No more historical data available (page {current_page} is past the last page).")
+                cursor.mark_exhausted(category, current_page)
+                break
+
+            resp.raise_for_status()
+            data = resp.json()
+            results = data["response"].get("results", [])
+            if "pages" in data["response"]:
+                cursor.set_pages(category, data["response"]["pages"])
+
+            if not results:
+                print(f"{prefix} No more historical data available.")
+                cursor.mark_exhausted(category, current_page)
+                break
+
+            page_saved_count, skipped_count, stored_ids = save_articles(results, store, category, state)
+            cursor.finish(category, current_page, stored_ids)
+            category_new_collected += page_saved_count
+
+            # Update User
+            print(f"   {prefix} Page {current_page}: Saved {page_saved_count} new | Skipped {skipped_count} known.")
+
+            # Reached articles we already have (or rejected before), everything older is known too
+            if stop_on_known and page_saved_count == 0 and skipped_count == len(results):
+                print(f"{prefix} Reached known articles, stopping.")
+                cursor.mark_exhausted(category, current_page + 1)
+                break
+
+        except Exception as e:
+            print(f"{prefix} Error on page {current_page}: {e}")
+            cursor.give_back(category, current_page)
+            break
+
+    print(f"{prefix} Finished. Total new: {category_new_collected}")
+    return key_index, category_new_collected
+
+
+def fetch_window(session, base_url, key_pool, category, from_date, to_date, store, state):
+    """
+    Fetches every article of one category published between from_date and
+    to_date (inclusive), oldest first. Returns (saved, newest date seen),
+    or None if the keys ran out of quota before the window was complete.
+    """
+    prefix = f"[{category} {from_date}..{to_date}]"
+    saved_total = 0
+    newest = ""
+    page = 1
+    pages = 1
+
+    while page <= pages:
+        key_index = key_pool.acquire()
+        if key_index is None:
+            print(f"!! {prefix} All keys are out of quota.")
+            return None
+
+        api_key = key_pool.api_keys[key_index]
+        params = {
+            "api-key": api_key,
+            "page-size": PAGE_SIZE,
+            "page": page,
+            "section": api_section_for(category),
+            "from-date": from_date,
+            "to-date": to_date,
+            "use-date": "published",
+            "order-by": "oldest",
+            "show-fields": "headline,byline,bodyText,trailText",
+            "show-tags": "all"
+        }
+
+        resp = get_page(session, base_url, params, key_index)
+        state.count_request(api_key)
+
+        # Quota: retire this key and retry the same page with the next one
+        if resp.status_code == 429:
+            print(f"!! Quota exceeded for Key #{key_index + 1}. Moving to next key...")
+            key_pool.mark_exhausted(key_index)
+            state.mark_key_exhausted(api_key)
+            continue
+
+        resp.raise_for_status()
+        data = resp.json()["response"]
+        results = data.get("results", [])
+        pages = data.get("pages", 1)
+        if not results:
+            break
+
+        page_saved_count, skipped_count, stored_ids = save_articles(results, store, category, state)
+        state.add_articles(category, stored_ids)
+        saved_total += page_saved_count
+        newest = max(newest, max(a.get("webPublicationDate") or "" for a in results))
+
+        print(f"   {prefix} Page {page}/{pages}: Saved {page_saved_count} new | Skipped {skipped_count} known.")
+        page += 1
+
+    return saved_total, newest
+
+
+def run_windows(session, base_url, key_pool, windows, store, state, max_workers, on_done):
+    """Fetches (category, from_date, to_date) windows in parallel, calling on_done for each completed one."""
+
+    def run(window):
+        category, from_date, to_date = window
+        try:
+            result = fetch_window(session, base_url, key_pool, category, from_date, to_date, store, state)
+        except Exception as e:
+            print(f"Error on {category} {from_date}..{to_date}: {e}")
+            return 0
+        if result is None:
+            return 0
+        saved, newest = result
+        on_done(category, from_date, to_date, saved, newest)
+        return saved
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return sum(pool.map(run, windows))
+
+
+def run_incremental(session, base_url, key_pool, store, state, max_workers):
+    """
+    "Since last run": one window per category, from the newest article we have
+    until today. The watermark only moves once the whole window was fetched.
+    """
+    today = date.today().isoformat()
+    windows = []
+    for category in CATEGORIES:
+        newest = state.watermark(category)
+        if newest:
+            # Dates are whole days, the article index drops the overlap
+            from_date = newest[:10]
+        else:
+            from_date = (date.today() - timedelta(days=INCREMENTAL_FIRST_RUN_DAYS)).isoformat()
+        print(f"{category}: fetching {from_date}..{today}")
+        windows.append((category, from_date, today))
+
+    def on_done(category, from_date, to_date, saved, newest):
+        if newest:
+            state.update_watermark(category, newest)
+        print(f"Finished {category}. Total new: {saved}")
+
+    return run_windows(session, base_url, key_pool, windows, store, state, max_workers, on_done)
+
+
+def date_shards(from_date, to_date, shard_days):
+    """Splits [from_date, to_date] into consecutive inclusive windows of shard_days days."""
+    shards = []
+    start = from_date
+    while start <= to_date:
+        end = min(to_date, start + timedelta(days=shard_days - 1))
+        shards.append((start.isoformat(), end.isoformat()))
+        start = end + timedelta(days=1)
+    return shards
+
+
+def run_backfill(session, base_url, key_pool, store, state, max_workers, from_date, to_date,
+                 shard_days=BACKFILL_SHARD_DAYS):
+    """
+    Historical backfill: every category's range is cut into independent date
+    shards that are fetched in parallel into the same data tree. Finished shards
+    are recorded, so a rerun only fetches the ones that are missing.
+    """
+    windows = []
+    for category in CATEGORIES:
+        done = state.done_shards(category)
+        for shard_from, shard_to in date_shards(from_date, to_date, shard_days):
+            if (shard_from, shard_to) not in done:
+                windows.append((category, shard_from, shard_to))
+    print(f"Backfill {from_date}..{to_date}: {len(windows)} shards to fetch.")
+
+    def on_done(category, from_date, to_date, saved, newest):
+        state.finish_shard(category, from_date, to_date, saved)
+        if newest:
+            state.update_watermark(category, newest)
+
+    return run_windows(session, base_url, key_pool, windows, store, state, max_workers, on_done)
+
+
+def run_pages(session, base_url, api_keys, store, state, max_workers, resume):
+    """The original page walk (order-by=newest), one worker per (key, category)."""
     # This cursor tracks the page number for each category globally.
-    # It ensures Key #2 starts searching where Key #1 ended.
-    category_page_cursor = {category: 1 for category in CATEGORIES}
-
-    for key_index, current_api_key in enumerate(API_KEYS):
-        print(f"\n{'=' * 20} SWITCHING TO API KEY #{key_index + 1} {'=' * 20}")
-
-        # Track how many NEW articles this specific key has collected
-        key_total_collected = 0
-
-        for category in CATEGORIES:
-            print(f"\n--- Category: {category} (Looking for {TARGET_PER_CATEGORY} new articles) ---")
-
-            clean_category = category.lower()
-            api_section = 'commentisfree' if clean_category == 'opinion' else clean_category
-
-            category_new_collected = 0
-
-            # loop until we find enough NEW articles for this category
-            while category_new_collected < TARGET_PER_CATEGORY:
-                current_page = category_page_cursor[category]
-
-                params = {
-                    "api-key": current_api_key,
-                    "page-size": PAGE_SIZE,
-                    "page": current_page,
-                    "section": api_section,
-                    "order-by": "newest",
-                    "show-fields": "headline,byline,bodyText,trailText",
-                    "show-tags": "all"
-                }
-
-                try:
-                    # Request data
-                    resp = requests.get(BASE_URL, params=params)
-
-                    # Handle Quota Limit (429)
-                    if resp.status_code == 429:
-                        print(f"!! Quota exceeded for Key #{key_index + 1}. Moving to next key...")
-                        # Break the 'while' loop to skip to the next category/key
-                        # But actually we want to break the CATEGORY loop too.
-                        # For simplicity, we force the counters to max to exit this key.
-                        category_new_collected = TARGET_PER_CATEGORY
-                        key_total_collected = TARGET_NEW_ARTICLES_PER_KEY
-                        break
-
-                    resp.raise_for_status()
-                    data = resp.json()
-                    results = data["response"].get("results", [])
-
-                    if not results:
-                        print(f"No more historical data available for {category}.")
-                        break
-
-                    output_dir = PROJECT_DIR / "data" / category
-                    output_dir.mkdir(parents=True, exist_ok=True)
-
-                    page_saved_count = 0
-                    skipped_count = 0
-
-                    for article in results:
-                        article_id = article["id"].replace("/", "_")
-                        file_path = output_dir / f"{article_id}.txt"
-
-                        # --- CRITICAL CHANGE: SKIP IF EXISTS ---
-                        if file_path.exists():
-                            skipped_count += 1
-                            continue  # Skip to next article, don't save, don't count
-
-                        # Process Content
-                        content = create_article_content(article)
-                        if content:
-                            file_path.write_text(content, encoding="utf-8")
-                            page_saved_count += 1
-                            category_new_collected += 1
-
-                    # Update User
-                    print(f"   Page {current_page}: Saved {page_saved_count} new | Skipped {skipped_count} existing.")
-
-                    # Move to next page for next time
-                    category_page_cursor[category] += 1
-
-                    # Small sleep to be polite
-                    time.sleep(0.3)
-
-                except Exception as e:
-                    print(f"Error on {category} page {current_page}: {e}")
-                    time.sleep(2)  # Wait a bit if error occurs
-                    break
-
-            key_total_collected += category_new_collected
-            print(f"Finished {category} for this key. Total new: {category_new_collected}")
-
-        print(f"Key #{key_index + 1} finished. Total new articles collected: {key_total_collected}")
-
-    print("\nScript finished. You should now have your target dataset!")
+    # It ensures Key #2 never fetches a page Key #1 already fetched,
+    # and the next run starts where this one ended.
+    cursor = PageCursor(CATEGORIES, state, resume)
+
+    limiters = [TokenBucket(REQUESTS_PER_SECOND_PER_KEY) for _ in api_keys]
+    quota_flags = [threading.Event() for _ in api_keys]
+    key_totals = [0] * len(api_keys)
+
+    for key_index, api_key in enumerate(api_keys):
+        requests_today, exhausted = state.key_usage(api_key)
+        if exhausted:
+            print(f"Key #{key_index + 1} already hit its quota today ({requests_today} requests), skipping.")
+            quota_flags[key_index].set()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(collect_category, session, base_url, key_index, api_key, category, cursor,
+                        limiters[key_index], quota_flags[key_index], store, state,
+                        stop_on_known=not resume)
+            for key_index, api_key in enumerate(api_keys)
+            for category in CATEGORIES
+        ]
+        for future in futures:
+            key_index, collected = future.result()
+            key_totals[key_index] += collected
+
+    for key_index, total in enumerate(key_totals):
+        print(f"Key #{key_index + 1} finished. Total new articles collected: {total}")
+    return sum(key_totals)
+
+
+@metrics.stage("collect")
+def main(base_url=BASE_URL, project_dir=PROJECT_DIR, api_keys=API_KEYS, max_workers=MAX_WORKERS,
+         resume=True, mode="pages", from_date=None, to_date=None):
+    """
+    mode="pages": the page walk. resume=True continues every category from the
+    checkpointed page, resume=False walks again from page 1 (newest) and stops
+    each category as soon as it reaches articles that are already in the index.
+    mode="incremental": only what was published since the last run, by date window.
+    mode="backfill": everything between from_date and to_date (datetime.date), in parallel date shards.
+    """
+    print(f"Fetching data to: {project_dir}")
+    project_dir.mkdir(parents=True, exist_ok=True)
+    # Articles the collector saved as .txt before the store existed go into the store
+    # (only the ones not there yet), so sensing, which then reads only the store, keeps them
+    legacy_dir = project_dir / "data"
+    if legacy_dir.is_dir():
+        migrated = migrate_text_tree(legacy_dir, project_dir / CORPUS_DIR_NAME)
+        if migrated:
+            print(f"Moved {migrated} articles from {legacy_dir} into the corpus store.")
+    store = CorpusStore(project_dir / CORPUS_DIR_NAME)
+
+    with CrawlState(project_dir / CRAWL_STATE_FILE) as state, create_session(max_workers) as session:
+        if state.article_count() == 0:
+            # Articles saved before the crawl index existed: old .txt tree and the store itself
+            indexed = state.index_existing_files(project_dir / "data")
+            by_category = {}
+            for article_id, (category, *_) in store.index.items():
+                by_category.setdefault(category, []).append(article_id)
+            for category, article_ids in by_category.items():
+                state.add_articles(category, article_ids)
+                indexed += len(article_ids)
+            if indexed:
+                print(f"Indexed {indexed} articles already on disk.")
+
+        if mode == "pages":
+            total = run_pages(session, base_url, api_keys, store, state, max_workers, resume)
+        elif mode == "incremental":
+            total = run_incremental(session, base_url, KeyPool(api_keys, state), store, state, max_workers)
+        elif mode == "backfill":
+            total = run_backfill(session, base_url, KeyPool(api_keys, state), store, state, max_workers,
+                                 from_date, to_date or date.today())
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+
+    print(f"\nScript finished. Total new articles collected: {total}")
+    print("You should now have your target dataset!")
+    return total
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Collect Guardian articles")
+    parser.add_argument("--mode", choices=["pages", "incremental", "backfill"], default="pages")
+    parser.add_argument("--fresh", action="store_true",
+                        help="pages mode: start again from the newest page instead of the saved cursor")
+    parser.add_argument("--from-date", type=date.fromisoformat, help="backfill start (YYYY-MM-DD)")
+    parser.add_argument("--to-date", type=date.fromisoformat, help="backfill end (YYYY-MM-DD), default today")
+    args = parser.parse_args()
+
+    if args.mode == "backfill" and args.from_date is None:
+        parser.error("--mode backfill needs --from-date")
+    main(resume=not args.fresh, mode=args.mode, from_date=args.from_date, to_date=args.to_date)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Per-label analysis of a TF-IDF (or any row-per-article) matrix, shared by
+# feature_extraction_2.analyze_top_features and yuval_feature.print_top_features.
+
+
+def class_centroids(X, labels):
+    """
+    Mean row of X for every label, all labels in one sparse product:
+    a (labels x rows) 0/1 indicator matrix times X, divided by the class sizes.
+    Returns (labels in order of first appearance, dense centroids array).
+    Rows whose label is missing are ignored.
+    """
+    codes, uniques = pd.factorize(pd.Series(labels).reset_index(drop=True))
+    rows = np.flatnonzero(codes >= 0)
+    indicator = sparse.csr_matrix(
+        (np.ones(len(rows)), (codes[rows], rows)), shape=(len(uniques), X.shape[0])
+    )
+    sums = indicator @ X
+    sums = sums.toarray() if sparse.issparse(sums) else np.asarray(sums)
+    counts = np.asarray(indicator.sum(axis=1))
+    return list(uniques), sums / counts
+
+
+def top_terms(X, labels, feature_names, k=10):
+    """
+    {label: [(term, mean score), ...]} with the k highest mean scores of every
+    label, highest first. Ties are ordered deterministically, as by
+    argsort(kind="stable")[-k:][::-1] (the later column first). Only the terms scoring at least the k-th highest score
+    are sorted, found with a partition.
+    """
+    feature_names = np.asarray(feature_names)
+    uniques, centroids = class_centroids(X, labels)
+    k = min(k, centroids.shape[1])
+
+    result = {}
+    for label, scores in zip(uniques, centroids):
+        if k == 0:
+            result[label] = []
+            continue
+        kth = np.partition(scores, -k)[-k]
+        candidates = np.flatnonzero(scores >= kth)
+        top = candidates[np.argsort(scores[candidates], kind="stable")[::-1][:k]]
+        result[label] = [(str(feature_names[i]), float(scores[i])) for i in top]
+    return result
@@ -1,155 +1,138 @@
-import pandas as pd
-import numpy as np
+import argparse
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy import sparse
 from pathlib import Path
 
+import metrics
+from feature_analysis import top_terms
+from feature_pipeline import FeaturePipeline
+from feature_store import export_csv, save_features
+from schema import read_articles
+from token_store import load_tokens
+
 # --- הגדרות נתיבים ---
 PROJECT_DIR = Path(r"C:\Users\yuval\Desktop\לימודים\ML")
 INPUT_FILE = PROJECT_DIR / "processed_data_separated.csv"  # הקובץ הנקי והמופרד
-OUTPUT_FILE = PROJECT_DIR / "dataset_features_final.csv"  # הקובץ הסופי למודל
+TOKENS_DIR = PROJECT_DIR / "processed_tokens"  # מזהי המילים שה-Pre-Processing כתב לאותן שורות
+FEATURES_DIR = PROJECT_DIR / "features"  # הפלט הסופי למודל: מטריצה דלילה בינארית (feature_store.py)
+OUTPUT_FILE = PROJECT_DIR / "dataset_features_final.csv"  # ייצוא CSV אופציונלי (--csv)
 MODEL_DIR = PROJECT_DIR / "models"
 
-if not MODEL_DIR.exists():
-    MODEL_DIR.mkdir()
+# "tfidf" = TfidfVectorizer עם max_features, "hashing" = hashing + IDF שמתעדכן בהדרגה (--hashing)
+TEXT_MODE = "tfidf"
+TRAIL_FEATURES = 1000  # 1000 מילים כי הטקסט חופשי ומגוון
+TAG_FEATURES = 500  # לתגיות מספיק 500 כי אוצר המילים שם מצומצם ומדויק יותר
+# 1 = הבלוקים מאומנים אחד אחרי השני, 2 ומעלה = טקסט ותגיות בתהליכים נפרדים במקביל (--workers)
+FIT_WORKERS = 1
+
+FEATURE_INPUT_COLUMNS = ['label', 'trail_text', 'tags', 'author']
 
 
 def analyze_top_features(df, vectorizer, tfidf_matrix, feature_type_name):
     """
     פונקציית עזר שמדפיסה את המילים/תגיות הכי חזקות בכל קטגוריה
     כדי שתוכלי לראות בעיניים שהחילוץ עובד טוב.
+    (הממוצעים של כל הקטגוריות מחושבים יחד ב-feature_analysis.top_terms)
     """
     print(f"\n--- Top Significant {feature_type_name} per Category ---")
-    unique_labels = df['label'].unique()
-    feature_names = np.array(vectorizer.get_feature_names_out())
-
-    for label in unique_labels:
-        indices = df.index[df['label'] == label].tolist()
-        if not indices: continue
-
-        class_matrix = tfidf_matrix[indices]
-        mean_scores = np.array(class_matrix.mean(axis=0)).flatten()
-
-        # 10 המילים החזקות ביותר
-        top_indices = mean_scores.argsort()[-10:][::-1]
+    top = top_terms(tfidf_matrix, df['label'], vectorizer.get_feature_names_out(), k=10)
 
+    for label, terms in top.items():
         print(f"Category: {label.upper()}")
         # הדפסה נקייה
-        results = [f"{feature_names[i]}" for i in top_indices]
-        print(", ".join(results))
+        print(", ".join(term for term, _ in terms))
+
+    return top
 
 
-def get_specialist_authors(df, min_articles=3):
+@metrics.stage("features")
+def main(input_file=INPUT_FILE, features_dir=FEATURES_DIR, model_dir=MODEL_DIR, csv_file=None,
+         text_mode=TEXT_MODE, tokens_dir=TOKENS_DIR, trail_features=TRAIL_FEATURES, tag_features=TAG_FEATURES,
+         workers=FIT_WORKERS):
     """
-    מחזירה רשימה של כותבים 'מומחים': כתבו לפחות 3 כתבות ורק בנושא אחד.
+    בונה את מטריצת המאפיינים כ-scipy.sparse CSR מתחילתה ועד סופה
+    (אין toarray על כל הטבלה), שומרת אותה ב-features_dir ומחזירה (X, שמות העמודות, labels).
+    csv_file: אם ניתן, גם ייצוא לפורמט ה-CSV הישן.
     """
-    print(f"\nAnalyzing Author Specialization...")
-    # סינון כותבים לא ידועים
-    df_clean = df[~df['author'].isin(['unknown', 'unknown author', 'guardian staff'])]
-
-    # יצירת מטריצת כותבים-נושאים
-    author_matrix = pd.crosstab(df_clean['author'], df_clean['label'])
-
-    # סינון לפי כמות כתבות
-    active_authors = author_matrix[author_matrix.sum(axis=1) >= min_articles]
-
-    # בדיקה: האם הכותב פעיל בדיוק בקטגוריה אחת?
-    is_specialist = (active_authors > 0).sum(axis=1) == 1
-    specialist_authors = active_authors[is_specialist].index.tolist()
-
-    print(f"Found {len(specialist_authors)} specialist authors.")
-    return specialist_authors
-
-
-def main():
     print("--- Starting Feature Extraction (Trail Text + Tags + Authors) ---")
 
-    if not INPUT_FILE.exists():
-        print(f"Error: {INPUT_FILE} not found. Run preprocessing first.")
+    if not input_file.exists():
+        print(f"Error: {input_file} not found. Run preprocessing first.")
         return
 
-    # 1. טעינת הנתונים
-    print("Loading data...")
-    df = pd.read_csv(INPUT_FILE)
+    model_dir.mkdir(exist_ok=True)
 
-    # מילוי ערכים חסרים (חשוב מאוד למניעת קריסות)
-    df['trail_text'] = df['trail_text'].fillna('')
-    df['tags'] = df['tags'].fillna('')
-    df['author'] = df['author'].fillna('unknown')
+    # 1. טעינת הנתונים: רק העמודות שהשלב צריך (בלי body), label ו-author כקטגוריות (schema.py)
+    print("Loading data...")
+    with metrics.timer("features.read_csv"):
+        df = read_articles(input_file, columns=FEATURE_INPUT_COLUMNS)
 
     print(f"Total articles: {len(df)}")
-
-    # --- חלק A: מאפיינים מה-Mini Headline (Trail Text) ---
-    print("\n1. Extracting Mini-Headline Features (Top 1000)...")
-    # משתמשים ב-1000 מילים כי הטקסט חופשי ומגוון
-    trail_vectorizer = TfidfVectorizer(max_features=1000)
-    X_trail = trail_vectorizer.fit_transform(df['trail_text'])
-
-    # הצגת ניתוח קצר
-    analyze_top_features(df, trail_vectorizer, X_trail, "Trail-Words")
-
-    # יצירת DataFrame ושמירה עם קידומת trail_
-    trail_features = pd.DataFrame(
-        X_trail.toarray(),
-        columns=[f"trail_{w}" for w in trail_vectorizer.get_feature_names_out()]
-    )
-    joblib.dump(trail_vectorizer, MODEL_DIR / "tfidf_trail.pkl")
-
-    # --- חלק B: מאפיינים מהתגיות (Tags) ---
-    print("\n2. Extracting Tag Features (Top 500)...")
-    # לתגיות מספיק 500 כי אוצר המילים שם מצומצם ומדויק יותר
-    tags_vectorizer = TfidfVectorizer(max_features=500)
-    X_tags = tags_vectorizer.fit_transform(df['tags'])
+    metrics.count("features.rows", len(df))
+
+    # אם יש מזהי מילים לאותן שורות, ה-TF-IDF נבנה מהם ולא מפירוק המחרוזות מחדש
+    # (רק אם נכתבו לגרסה הנוכחית של input_file, אחרת הם של ריצת Pre-Processing קודמת)
+    tokens = load_tokens(tokens_dir, source=input_file) if tokens_dir else None
+    if tokens is not None and tokens[0] != len(df):
+        print(f"Ignoring {tokens_dir}: {tokens[0]} rows, the input has {len(df)}")
+        tokens = None
+    if tokens is not None:
+        print(f"Using pre-tokenized text from {tokens_dir}")
+        tokens = tokens[1:]
+
+    # כל החלק המאומן (TF-IDF לטקסט ולתגיות + כותבים מומחים) נמצא ב-FeaturePipeline,
+    # כדי שאפשר יהיה לטעון אותו אחר כך ולהפוך כתבות חדשות למאפיינים בלי לאמן מחדש
+    pipeline = FeaturePipeline(trail_features, tag_features, text_mode=text_mode)
+    print(f"\n1-3. Fitting Trail Text, Tags (without category names) and Specialist Authors ({text_mode})...")
+    with metrics.timer("features.fit"):
+        blocks = pipeline.fit_transform_blocks(df, cleaned=True, tokens=tokens, workers=workers)
+    (_, X_trail, trail_columns), (_, X_tags, tags_columns), (_, X_authors, author_columns) = blocks
 
     # הצגת ניתוח קצר
-    analyze_top_features(df, tags_vectorizer, X_tags, "Tags")
-
-    # יצירת DataFrame ושמירה עם קידומת tag_
-    tags_features = pd.DataFrame(
-        X_tags.toarray(),
-        columns=[f"tag_{w}" for w in tags_vectorizer.get_feature_names_out()]
-    )
-    joblib.dump(tags_vectorizer, MODEL_DIR / "tfidf_tags.pkl")
-
-    # --- חלק C: מאפייני כותבים מומחים (Authors) ---
-    print("\n3. Extracting Specialist Author Features...")
-
-    # שימוש בפונקציה החכמה לזיהוי מומחים
-    selected_authors = get_specialist_authors(df, min_articles=3)
-
-    # שמירת הרשימה לעתיד
-    joblib.dump(selected_authors, MODEL_DIR / "authors_list.pkl")
-
-    # יצירת עמודות (One-Hot Encoding)
-    author_features = pd.DataFrame()
-    for author in selected_authors:
-        col_name = f"auth_{author.replace(' ', '_')}"
-        author_features[col_name] = df['author'].apply(lambda x: 1 if x == author else 0)
+    labeled = df.reset_index(drop=True)
+    analyze_top_features(labeled, pipeline.trail_vectorizer, X_trail, "Trail-Words")
+    analyze_top_features(labeled, pipeline.tags_vectorizer, X_tags, "Tags")
+
+    # שמירת ה-pipeline המאומן כקובץ אחד (וגם הקבצים הישנים, למי שעוד משתמש בהם)
+    with metrics.timer("features.save_models"):
+        bundle_path = pipeline.save(model_dir)
+    joblib.dump(pipeline.trail_vectorizer, model_dir / "tfidf_trail.pkl")
+    joblib.dump(pipeline.tags_vectorizer, model_dir / "tfidf_tags.pkl")
+    joblib.dump(pipeline.authors, model_dir / "authors_list.pkl")
+    print(f"Saved fitted feature pipeline to: {bundle_path}")
 
     # --- חלק D: איחוד ושמירה סופית ---
     print("\n4. Combining all features...")
 
-    # איפוס אינדקסים כדי שהחיבור יעבוד חלק (קריטי!)
-    df.reset_index(drop=True, inplace=True)
-    trail_features.reset_index(drop=True, inplace=True)
-    tags_features.reset_index(drop=True, inplace=True)
-    author_features.reset_index(drop=True, inplace=True)
-
-    # חיבור כל הטבלאות לטבלה אחת ענקית
-    final_dataset = pd.concat([trail_features, tags_features, author_features], axis=1)
+    # חיבור כל הבלוקים למטריצה דלילה אחת, העמודות וה-labels נשמרים לצידה
+    with metrics.timer("features.hstack"):
+        X = sparse.hstack([X_trail, X_tags, X_authors], format='csr')
+    columns = trail_columns + tags_columns + author_columns
+    labels = labeled['label']
 
-    # הוספת ה-Label (עמודת המטרה) בסוף
-    final_dataset['label'] = df['label']
+    # שמירה בפורמט בינארי (כל בלוק עם ה-dtype שלו, בשביל ייצוא ה-CSV)
+    blocks = [("trail", len(trail_columns), X_trail.dtype), ("tag", len(tags_columns), X_tags.dtype),
+              ("auth", len(author_columns), X_authors.dtype)]
+    save_features(features_dir, X, columns, labels, blocks, fit_id=pipeline.fit_id)
+    if csv_file:
+        export_csv(features_dir, csv_file)
+        print(f"CSV export saved to: {csv_file}")
 
-    # שמירה לקובץ CSV
-    final_dataset.to_csv(OUTPUT_FILE, index=False)
+    density = X.nnz / max(X.shape[0] * X.shape[1], 1)
+    print(f"\nSuccess! Final dataset saved to: {features_dir}")
+    print(f"Dataset Dimensions: {(X.shape[0], X.shape[1] + 1)} (density {density:.2%})")
+    print(f" - Trail Text features: {len(trail_columns)}")
+    print(f" - Tag features: {len(tags_columns)}")
+    print(f" - Author features: {len(author_columns)}")
 
-    print(f"\nSuccess! Final dataset saved to: {OUTPUT_FILE}")
-    print(f"Dataset Dimensions: {final_dataset.shape}")
-    print(f" - Trail Text features: {trail_features.shape[1]}")
-    print(f" - Tag features: {tags_features.shape[1]}")
-    print(f" - Author features: {author_features.shape[1]}")
+    return X, columns, labels
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Trail text + tags + authors feature extraction")
+    parser.add_argument("--csv", action="store_true", help=f"also export {OUTPUT_FILE.name}")
+    parser.add_argument("--hashing", action="store_true", help="hashed trail/tag features with incremental IDF")
+    parser.add_argument("--workers", type=int, default=FIT_WORKERS, help="processes for fitting the text blocks")
+    args = parser.parse_args()
+    main(csv_file=OUTPUT_FILE if args.csv else None, text_mode="hashing" if args.hashing else TEXT_MODE,
+         workers=args.workers)
\ No newline at end of file
@@ -0,0 +1,221 @@
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from hashing_features import HASH_FEATURES, IncrementalTfidf
+from schema import FEATURE_DTYPE, FLAG_DTYPE, fill_category
+from sensing import record_to_row
+from token_store import fit_tfidf_from_tokens
+from text_cleaning import STOP_WORDS, clean_text_batch, normalize_authors
+
+# The fitted part of the feature stage in one object: text cleaning, trail
+# TF-IDF, tag TF-IDF and the specialist-author one-hot. fit() once on the
+# processed training data, save() it to MODEL_DIR, and any later process can
+# load() it and transform() new articles in batches without refitting.
+
+BUNDLE_FILE = "feature_pipeline.joblib"
+
+# Category names show up in the Guardian tags ("Sport", "Football Sport") and
+# would hand the label to the model, so the tag vectorizer drops them
+# (the leakage stop list from the notebook)
+LEAKAGE_WORDS = {'sport', 'news', 'culture', 'opinion', 'commentisfree', 'uk', 'world'}
+TAG_STOP_WORDS = sorted(LEAKAGE_WORDS | {w for w in STOP_WORDS if w.isalpha()})
+
+UNKNOWN_AUTHORS = ['unknown', 'unknown author', 'guardian staff']
+
+
+def get_specialist_authors(df, min_articles=3):
+    """
+    מחזירה רשימה של כותבים 'מומחים': כתבו לפחות 3 כתבות ורק בנושא אחד.
+    """
+    print(f"\nAnalyzing Author Specialization...")
+    # סינון כותבים לא ידועים
+    df_clean = df[~df['author'].isin(UNKNOWN_AUTHORS)]
+
+    # יצירת מטריצת כותבים-נושאים
+    author_matrix = pd.crosstab(df_clean['author'], df_clean['label'])
+
+    # סינון לפי כמות כתבות
+    active_authors = author_matrix[author_matrix.sum(axis=1) >= min_articles]
+
+    # בדיקה: האם הכותב פעיל בדיוק בקטגוריה אחת?
+    is_specialist = (active_authors > 0).sum(axis=1) == 1
+    specialist_authors = active_authors[is_specialist].index.tolist()
+
+    print(f"Found {len(specialist_authors)} specialist authors.")
+    return specialist_authors
+
+
+def author_one_hot(authors, selected_authors):
+    """
+    One-Hot לכותבים המומחים במעבר אחד: כל כותב מקבל קוד קטגוריאלי
+    (-1 = לא מומחה), והקודים הופכים ישירות למטריצה דלילה של 0/1 (בית אחד לערך).
+    מחזירה (מטריצה, שמות עמודות auth_...).
+    """
+    codes = pd.Categorical(authors, categories=selected_authors).codes
+    rows = np.flatnonzero(codes >= 0)
+    X_authors = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=FLAG_DTYPE), (rows, codes[rows])),
+        shape=(len(codes), len(selected_authors))
+    )
+    columns = [f"auth_{author.replace(' ', '_')}" for author in selected_authors]
+    return X_authors, columns
+
+
+def fit_text_block(vectorizer, texts, tokens=None):
+    """
+    Fits one text vectorizer and returns (the fitted vectorizer, matrix).
+    Top level, so it can run in a worker process that gets only its own column.
+    tokens: (ids, offsets, vocabulary) to fit from token ids instead of texts.
+    """
+    if tokens is not None:
+        return vectorizer, fit_tfidf_from_tokens(vectorizer, *tokens)
+    return vectorizer, vectorizer.fit_transform(texts)
+
+
+class FeaturePipeline:
+    """
+    fit / transform over frames with trail_text, tags and author columns
+    (plus label for fit). Raw rows (sensed_data.csv, sensing.record_to_row)
+    are cleaned like Pre-Processing; pass cleaned=True for rows that already are.
+
+    text_mode="tfidf" uses TfidfVectorizer with max_features, "hashing" uses
+    IncrementalTfidf (hashing_features.py) with hash_features buckets per
+    field, which can take new articles later through partial_fit().
+    Both give FEATURE_DTYPE (float32) matrices, the author block is FLAG_DTYPE.
+    """
+
+    def __init__(self, trail_features=1000, tag_features=500, min_author_articles=3,
+                 tag_stop_words=TAG_STOP_WORDS, text_mode="tfidf", hash_features=HASH_FEATURES):
+        if text_mode == "tfidf":
+            self.trail_vectorizer = TfidfVectorizer(max_features=trail_features, dtype=FEATURE_DTYPE)
+            self.tags_vectorizer = TfidfVectorizer(max_features=tag_features, stop_words=list(tag_stop_words),
+                                                   dtype=FEATURE_DTYPE)
+        elif text_mode == "hashing":
+            self.trail_vectorizer = IncrementalTfidf(hash_features, dtype=FEATURE_DTYPE)
+            self.tags_vectorizer = IncrementalTfidf(hash_features, stop_words=list(tag_stop_words),
+                                                    dtype=FEATURE_DTYPE)
+        else:
+            raise ValueError(f"unknown text_mode {text_mode!r}, expected 'tfidf' or 'hashing'")
+        self.text_mode = text_mode
+        self.min_author_articles = min_author_articles
+        self.authors = None
+        # A new id for every fit / partial_fit, stored with the features built by it
+        # (feature_store.save_features fit_id), so the two can be matched up later
+        self.fit_id = None
+
+    def prepare(self, df, cleaned=False):
+        """The three input columns, filled and (unless cleaned) cleaned. author and label may be categoricals."""
+        prepared = pd.DataFrame(index=df.index)
+        if cleaned:
+            prepared['trail_text'] = df['trail_text'].fillna('')
+            prepared['tags'] = df['tags'].fillna('')
+            prepared['author'] = fill_category(df['author'], 'unknown')
+        else:
+            prepared['trail_text'] = clean_text_batch(df['trail_text'].fillna(''))
+            prepared['tags'] = clean_text_batch(df['tags'].fillna(''))
+            prepared['author'] = normalize_authors(df['author'])
+        if 'label' in df:
+            prepared['label'] = df['label']
+        return prepared.reset_index(drop=True)
+
+    def fit_transform_blocks(self, df, cleaned=False, tokens=None, workers=1):
+        """
+        Fits on df and returns its blocks: [(name, matrix, columns)] for trail, tag and auth.
+        tokens: (vocabulary, {field: (ids, offsets)}) from token_store.load_tokens for the
+        same rows; the TF-IDF vectorizers are then fitted from the ids, not the strings.
+        workers > 1 fits the trail and tag blocks in two worker processes (each is
+        sent only its own column) while the author block is built here.
+        """
+        df = self.prepare(df, cleaned)
+        self.fit_id = uuid.uuid4().hex
+        jobs = []
+        for vectorizer, field in ((self.trail_vectorizer, 'trail_text'), (self.tags_vectorizer, 'tags')):
+            if tokens is not None and self.text_mode == "tfidf":
+                vocab, fields = tokens
+                jobs.append((vectorizer, None, (*fields[field], vocab)))
+            else:
+                jobs.append((vectorizer, df[field], None))
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                futures = [pool.submit(fit_text_block, *job) for job in jobs]
+                self.authors = get_specialist_authors(df, self.min_author_articles)
+                X_authors, author_columns = author_one_hot(df['author'], self.authors)
+                (self.trail_vectorizer, X_trail), (self.tags_vectorizer, X_tags) = [f.result() for f in futures]
+        else:
+            (_, X_trail), (_, X_tags) = [fit_text_block(*job) for job in jobs]
+            self.authors = get_specialist_authors(df, self.min_author_articles)
+            X_authors, author_columns = author_one_hot(df['author'], self.authors)
+        return [
+            ("trail", X_trail, self.trail_columns()),
+            ("tag", X_tags, self.tag_columns()),
+            ("auth", X_authors, author_columns),
+        ]
+
+    def fit(self, df, cleaned=False):
+        self.fit_transform_blocks(df, cleaned)
+        return self
+
+    def partial_fit(self, df, cleaned=False):
+        """
+        Hashing mode only: adds a batch of new articles to the trail and tag
+        IDF statistics. The specialist authors stay the ones found by fit().
+        """
+        if self.text_mode != "hashing":
+            raise ValueError("partial_fit needs text_mode='hashing', TfidfVectorizer can only be refitted")
+        df = self.prepare(df, cleaned)
+        self.fit_id = uuid.uuid4().hex
+        self.trail_vectorizer.partial_fit(df['trail_text'])
+        self.tags_vectorizer.partial_fit(df['tags'])
+        return self
+
+    def transform_blocks(self, df, cleaned=False):
+        if self.authors is None:
+            raise RuntimeError("FeaturePipeline is not fitted")
+        df = self.prepare(df, cleaned)
+        X_authors, author_columns = author_one_hot(df['author'], self.authors)
+        return [
+            ("trail", self.trail_vectorizer.transform(df['trail_text']), self.trail_columns()),
+            ("tag", self.tags_vectorizer.transform(df['tags']), self.tag_columns()),
+            ("auth", X_authors, author_columns),
+        ]
+
+    def transform(self, df, cleaned=False):
+        """CSR matrix with the columns of self.columns(), one row per row of df."""
+        return sparse.hstack([X for _, X, _ in self.transform_blocks(df, cleaned)], format='csr')
+
+    def transform_records(self, records):
+        """transform() for structured article records (data_collection.create_article_record)."""
+        rows = pd.DataFrame([record_to_row(r) for r in records], columns=['trail_text', 'tags', 'author'])
+        return self.transform(rows)
+
+    def trail_columns(self):
+        return [f"trail_{w}" for w in self.trail_vectorizer.get_feature_names_out()]
+
+    def tag_columns(self):
+        return [f"tag_{w}" for w in self.tags_vectorizer.get_feature_names_out()]
+
+    def columns(self):
+        return self.trail_columns() + self.tag_columns() + [f"auth_{a.replace(' ', '_')}" for a in self.authors]
+
+    def save(self, model_dir):
+        """Writes the fitted bundle to model_dir / BUNDLE_FILE and returns the path."""
+        path = Path(model_dir) / BUNDLE_FILE
+        # stop_words_ holds every term max_features cut off, only kept for
+        # introspection; without it the bundle is a fraction of the size
+        for vectorizer in (self.trail_vectorizer, self.tags_vectorizer):
+            if hasattr(vectorizer, "stop_words_"):
+                del vectorizer.stop_words_
+        joblib.dump(self, path)
+        return path
+
+    @classmethod
+    def load(cls, model_dir):
+        return joblib.load(Path(model_dir) / BUNDLE_FILE)
@@ -0,0 +1,247 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import joblib
+from scipy import sparse
+
+from data_collection import create_article_record
+from feature_pipeline import FeaturePipeline
+from sensing import record_to_row
+
+# Long-lived featurization / classification of single Guardian articles.
+# The fitted FeaturePipeline (and a classifier, if one was saved) is loaded
+# from MODEL_DIR once; every request carries one raw API result (the dict
+# create_article_record consumes) and gets its non-zero features back, plus
+# the predicted label when there is a classifier.
+#
+# Concurrent requests are micro-batched: a single worker thread takes what is
+# queued (up to MAX_BATCH articles, waiting at most MAX_WAIT_SECONDS for more)
+# and runs one transform over all of them. An article that cannot be
+# featurized gets {"id", "error"} back (HTTP 400) without failing the others.
+#
+#   python feature_service.py --http 8080   POST /featurize  {article json}
+#   python feature_service.py               JSON lines on stdin -> JSON lines on stdout
+
+PROJECT_DIR = Path(r"C:\Users\yuval\Desktop\לימודים\ML")
+MODEL_DIR = PROJECT_DIR / "models"
+CLASSIFIER_FILE = "classifier.pkl"
+
+MAX_BATCH = 64
+MAX_WAIT_SECONDS = 0.005
+
+
+class MicroBatcher:
+    """Collects submitted articles into batches for one worker thread."""
+
+    def __init__(self, pipeline, classifier=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT_SECONDS):
+        self.pipeline = pipeline
+        self.classifier = classifier
+        self.columns = pipeline.columns()
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, article):
+        """Queues one raw API article, returns a Future of its response dict."""
+        future = Future()
+        self.queue.put((article, future))
+        return future
+
+    def close(self):
+        self.queue.put(None)
+        self.worker.join()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)
+                    break
+                batch.append(item)
+            self._process(batch)
+
+    def _process(self, batch):
+        self.batches += 1
+        try:
+            responses = self.featurize([article for article, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), response in zip(batch, responses):
+            future.set_result(response)
+
+    def featurize(self, articles):
+        """
+        One response dict per raw API article, transformed as a single batch.
+        An article that cannot be turned into a record (or transformed) gets an
+        "error" entry of its own, the rest of the batch is featurized as usual.
+        """
+        records = []
+        responses = []
+        for article in articles:
+            responses.append({"id": article.get("id") if isinstance(article, dict) else None})
+            try:
+                record = create_article_record(article) if isinstance(article, dict) and "id" in article else None
+                if record is not None:
+                    # The row transform_records builds, so a malformed field fails here, for this article only
+                    record_to_row(record)
+            except Exception as e:
+                record = None
+                responses[-1]["error"] = f"malformed article: {type(e).__name__}: {e}"
+            else:
+                if record is None:
+                    responses[-1]["error"] = "not an article with a body (or a correction)"
+            records.append(record)
+
+        kept = [i for i, record in enumerate(records) if record is not None]
+        if not kept:
+            return responses
+
+        try:
+            X = self.pipeline.transform_records([records[i] for i in kept])
+        except Exception:
+            # Find the article(s) the batch transform failed on, one at a time
+            rows = []
+            for i in kept:
+                try:
+                    rows.append(self.pipeline.transform_records([records[i]]))
+                except Exception as e:
+                    responses[i]["error"] = f"transform failed: {type(e).__name__}: {e}"
+            kept = [i for i in kept if "error" not in responses[i]]
+            if not kept:
+                return responses
+            X = sparse.vstack(rows, format="csr")
+
+        labels = self.classifier.predict(X) if self.classifier is not None else None
+        for row, i in enumerate(kept):
+            start, end = X.indptr[row], X.indptr[row + 1]
+            responses[i]["features"] = {self.columns[c]: float(v)
+                                        for c, v in zip(X.indices[start:end], X.data[start:end])}
+            if labels is not None:
+                responses[i]["label"] = str(labels[row])
+        return responses
+
+
+def load_batcher(model_dir=MODEL_DIR, max_batch=MAX_BATCH, max_wait=MAX_WAIT_SECONDS):
+    model_dir = Path(model_dir)
+    pipeline = FeaturePipeline.load(model_dir)
+    classifier_path = model_dir / CLASSIFIER_FILE
+    classifier = joblib.load(classifier_path) if classifier_path.exists() else None
+    return MicroBatcher(pipeline, classifier, max_batch, max_wait)
+
+
+class FeatureServiceHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        if self.path != "/featurize":
+            return self._send(404, {"message": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            article = json.loads(self.rfile.read(length))
+        except ValueError:
+            return self._send(400, {"message": "body is not JSON"})
+        try:
+            response = self.server.batcher.submit(article).result()
+        except Exception as e:
+            return self._send(500, {"message": f"{type(e).__name__}: {e}"})
+        self._send(400 if "error" in response else 200, response)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FeatureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 drops connections under a burst of
+    # clients, and a dropped connect costs a 1s retry
+    request_queue_size = 128
+
+
+def make_server(batcher, host="127.0.0.1", port=0):
+    """Creates (but does not start) the HTTP service. port=0 picks a free port."""
+    server = FeatureServer((host, port), FeatureServiceHandler)
+    server.batcher = batcher
+    return server
+
+
+def serve_lines(batcher, lines, out):
+    """
+    JSON lines in, JSON lines out, in input order. Lines are submitted as they
+    are read, so a burst of input is featurized in batches.
+    """
+    pending = queue.Queue()
+
+    def read():
+        for line in lines:
+            if line.strip():
+                try:
+                    pending.put(batcher.submit(json.loads(line)))
+                except ValueError:
+                    done = Future()
+                    done.set_result({"error": "line is not JSON"})
+                    pending.put(done)
+        pending.put(None)
+
+    threading.Thread(target=read, daemon=True).start()
+    while (future := pending.get()) is not None:
+        try:
+            response = future.result()
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        out.write(json.dumps(response) + "\n")
+        out.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Featurize / classify single Guardian articles")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--http", type=int, metavar="PORT", help="serve POST /featurize instead of stdin")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    args = parser.parse_args()
+
+    batcher = load_batcher(args.model_dir, args.max_batch)
+    if args.http is None:
+        serve_lines(batcher, sys.stdin, sys.stdout)
+        batcher.close()
+        return
+
+    server = make_server(batcher, port=args.http)
+    print(f"Feature service listening on http://127.0.0.1:{args.http}/featurize", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        batcher.close()
+
+
+if __name__ == "__main__":
+    main()
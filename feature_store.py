@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import metrics
+
+# Binary on-disk form of the feature matrix built by feature_extraction_2.
+#
+# Layout of a feature store directory:
+#   data.npy, indices.npy, indptr.npy - the CSR arrays, uncompressed .npy so
+#                                       training jobs can np.load them with mmap_mode
+#   labels.npy                        - one fixed-width string per row
+#   manifest.json                     - shape, column names, the blocks
+#                                       (trail / tag / auth) with their dtype, and the
+#                                       fit_id of the FeaturePipeline that built them
+#
+# manifest.json is written last, so a directory without one is an unfinished save.
+
+MANIFEST_FILE = "manifest.json"
+CSR_ARRAYS = ("data", "indices", "indptr")
+CSV_CHUNK_ROWS = 5000
+
+
+@metrics.timed("feature_store.save")
+def save_features(store_dir, X, columns, labels, blocks=None, fit_id=None):
+    """
+    Writes a CSR matrix, its column names and the row labels to store_dir.
+    blocks: [(name, n_columns, dtype)] splitting the columns, used by export_csv
+    to print every block in its original dtype (e.g. 0/1 for the author columns).
+    fit_id: FeaturePipeline.fit_id of the fitted pipeline that produced X.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    X = sparse.csr_matrix(X)
+    if len(columns) != X.shape[1] or len(labels) != X.shape[0]:
+        raise ValueError(f"matrix {X.shape} does not match {len(labels)} labels x {len(columns)} columns")
+
+    if not X.has_canonical_format:
+        # Sorted, duplicate-free indices, so the read-only mmap never needs sorting in place
+        X = X.copy()
+        X.sum_duplicates()
+
+    blocks = blocks or [("features", X.shape[1], str(X.dtype))]
+    manifest_path = store_dir / MANIFEST_FILE
+    if manifest_path.exists():
+        manifest_path.unlink()
+
+    for name in CSR_ARRAYS:
+        np.save(store_dir / f"{name}.npy", getattr(X, name))
+    np.save(store_dir / "labels.npy", np.asarray(labels, dtype=str))
+
+    manifest = {
+        "shape": list(X.shape),
+        "nnz": int(X.nnz),
+        "columns": list(columns),
+        "blocks": [{"name": name, "columns": int(n), "dtype": str(dtype)} for name, n, dtype in blocks],
+        "fit_id": fit_id,
+    }
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+    metrics.count("feature_store.bytes_written", sum(p.stat().st_size for p in store_dir.iterdir() if p.is_file()))
+
+
+def load_manifest(store_dir):
+    manifest_path = Path(store_dir) / MANIFEST_FILE
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"{manifest_path} not found (no feature store, or an unfinished save)")
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_features(store_dir, mmap=True):
+    """
+    (X, columns, labels) from a feature store. With mmap the CSR arrays and the
+    labels stay memory-mapped read-only, so only the rows a job touches are read.
+    """
+    store_dir = Path(store_dir)
+    manifest = load_manifest(store_dir)
+    mode = "r" if mmap else None
+    data, indices, indptr = (np.load(store_dir / f"{name}.npy", mmap_mode=mode) for name in CSR_ARRAYS)
+    X = sparse.csr_matrix((data, indices, indptr), shape=tuple(manifest["shape"]), copy=False)
+    # save_features only writes canonical matrices
+    X.has_canonical_format = True
+    labels = np.load(store_dir / "labels.npy", mmap_mode=mode)
+    return X, manifest["columns"], labels
+
+
+@metrics.timed("feature_store.export_csv")
+def export_csv(store_dir, output_file, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Optional export to the old dataset_features_final.csv format (features, then label),
+    densifying chunk_rows rows at a time.
+    """
+    manifest = load_manifest(store_dir)
+    X, columns, labels = load_features(store_dir)
+    n_rows = X.shape[0]
+
+    spans = []
+    start = 0
+    for block in manifest["blocks"]:
+        spans.append((start, start + block["columns"], np.dtype(block["dtype"])))
+        start += block["columns"]
+
+    for row in range(0, max(n_rows, 1), chunk_rows):
+        rows = X[row:row + chunk_rows]
+        with metrics.timer("feature_store.export_toarray"):
+            parts = [pd.DataFrame(rows[:, lo:hi].toarray().astype(dtype, copy=False), columns=columns[lo:hi])
+                     for lo, hi, dtype in spans]
+            chunk = pd.concat(parts, axis=1)
+        chunk['label'] = labels[row:row + chunk_rows]
+        with metrics.timer("feature_store.export_to_csv"):
+            chunk.to_csv(output_file, index=False, mode='w' if row == 0 else 'a', header=row == 0)
+    metrics.count("feature_store.csv_bytes_written", Path(output_file).stat().st_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a feature store to CSV")
+    parser.add_argument("store_dir", type=Path)
+    parser.add_argument("output_file", type=Path)
+    args = parser.parse_args()
+
+    export_csv(args.store_dir, args.output_file)
+    print(f"Exported {args.store_dir} to {args.output_file}")
+
+
+if __name__ == "__main__":
+    main()
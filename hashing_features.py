@@ -0,0 +1,85 @@
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from sklearn.utils import murmurhash3_32
+
+# TF-IDF over a fixed hashed feature space, as an alternative to
+# TfidfVectorizer(max_features=...) for trail text and tags. There is no
+# vocabulary to build, so new articles can be added with partial_fit(): only
+# the document frequencies and the document count are updated, and the IDF
+# weights follow without refitting on the whole history.
+
+HASH_FEATURES = 2 ** 16
+
+
+class IncrementalTfidf:
+    """
+    Same weighting as TfidfVectorizer's defaults (raw counts, smooth idf,
+    l2 norm), over n_features hash buckets instead of a vocabulary.
+    With track_terms, the first term seen in every bucket is kept, so
+    get_feature_names_out() gives readable names for top-term analysis.
+    dtype: of the returned matrices, like TfidfVectorizer's.
+    """
+
+    def __init__(self, n_features=HASH_FEATURES, stop_words=None, track_terms=True, dtype=np.float64):
+        self.n_features = n_features
+        self.stop_words = stop_words
+        self.track_terms = track_terms
+        self.dtype = dtype
+        self.hasher = HashingVectorizer(n_features=n_features, stop_words=stop_words,
+                                        alternate_sign=False, norm=None, dtype=dtype)
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self._reset()
+
+    def partial_fit(self, texts):
+        """Adds a batch of documents to the document-frequency statistics."""
+        self._update(self.hasher.transform(texts), texts)
+        return self
+
+    def fit(self, texts):
+        self._reset()
+        return self.partial_fit(texts)
+
+    def fit_transform(self, texts):
+        self._reset()
+        counts = self.hasher.transform(texts)
+        self._update(counts, texts)
+        return self._weight(counts)
+
+    def transform(self, texts):
+        return self._weight(self.hasher.transform(texts))
+
+    def idf(self):
+        return np.log((1 + self.n_documents) / (1 + self.document_frequency)) + 1
+
+    def get_feature_names_out(self):
+        names = np.array([f"h{i}" for i in range(self.n_features)], dtype=object)
+        for bucket, term in self.terms.items():
+            names[bucket] = term
+        return names
+
+    def _reset(self):
+        self.document_frequency[:] = 0
+        self.n_documents = 0
+        self.terms = {}
+
+    def _update(self, counts, texts):
+        self.n_documents += counts.shape[0]
+        # A document adds at most 1 to a bucket: indices are unique per CSR row
+        self.document_frequency += np.bincount(counts.indices, minlength=self.n_features)
+        if self.track_terms:
+            analyze = self.hasher.build_analyzer()
+            for term in sorted({term for text in texts for term in analyze(text)}):
+                self.terms.setdefault(self._bucket(term), term)
+
+    def _bucket(self, term):
+        # The same index HashingVectorizer gives a term (sklearn's _hashing_fast)
+        h = murmurhash3_32(term, seed=0)
+        if h == -2 ** 31:
+            return (2 ** 31 - 1 - (self.n_features - 1)) % self.n_features
+        return abs(h) % self.n_features
+
+    def _weight(self, counts):
+        weighted = counts @ sparse.diags(self.idf().astype(counts.dtype))
+        return normalize(sparse.csr_matrix(weighted), norm="l2", copy=False)
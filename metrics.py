@@ -0,0 +1,184 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+# Timers, counters and histograms around the hot paths of the pipeline
+# scripts, written as JSON lines. Off (and close to free) unless switched on
+# from the environment, no code edits needed:
+#
+#   PIPELINE_METRICS=1         one JSON line per stage on stderr
+#   PIPELINE_METRICS=<file>    ...appended to <file> instead
+#   PIPELINE_PROFILE=<dir>     also a cProfile dump per stage run, <dir>/<stage>-<pid>.prof
+#
+# A stage line looks like
+#   {"event": "stage", "stage": "sense", "status": "ok", "seconds": 12.3,
+#    "timers": {"sense.parse_file": {"count": 500, "seconds": 4.1, "max": 0.02}},
+#    "counters": {"sense.bytes_read": 1234567},
+#    "histograms": {"http.request_seconds": {"le": [...], "counts": [...], "count": 80, "sum": 9.6}}}
+#
+# Worker processes have their own registry: run the task through collecting()
+# there and merge() what it returns in the parent.
+
+METRICS_ENV = "PIPELINE_METRICS"
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+# Upper bounds (seconds) of the latency histogram buckets, the last bucket is everything above
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ENABLED = os.environ.get(METRICS_ENV, "") not in ("", "0")
+PROFILE_DIR = os.environ.get(PROFILE_ENV) or None
+
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+_histograms = {}
+
+
+def count(name, n=1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def add_time(name, seconds):
+    if not ENABLED:
+        return
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            _timers[name] = {"count": 1, "seconds": seconds, "max": seconds}
+        else:
+            timer["count"] += 1
+            timer["seconds"] += seconds
+            timer["max"] = max(timer["max"], seconds)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS):
+    """Adds value to the histogram name (counts per bucket, plus count and sum)."""
+    if not ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = {"le": list(buckets), "counts": [0] * (len(buckets) + 1),
+                                             "count": 0, "sum": 0.0}
+        histogram["counts"][bisect_left(histogram["le"], value)] += 1
+        histogram["count"] += 1
+        histogram["sum"] += value
+
+
+@contextmanager
+def timer(name):
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator version of timer(); returns the function itself when metrics are off."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def drain():
+    """Everything recorded in this process so far, which is then reset."""
+    global _timers, _counters, _histograms
+    with _lock:
+        snapshot = {"timers": _timers, "counters": _counters, "histograms": _histograms}
+        _timers, _counters, _histograms = {}, {}, {}
+    return snapshot
+
+
+def merge(snapshot):
+    """Adds a drain() snapshot (e.g. from a worker process) to this process's metrics."""
+    if not ENABLED or not snapshot:
+        return
+    with _lock:
+        for name, other in snapshot["timers"].items():
+            timer = _timers.setdefault(name, {"count": 0, "seconds": 0.0, "max": 0.0})
+            timer["count"] += other["count"]
+            timer["seconds"] += other["seconds"]
+            timer["max"] = max(timer["max"], other["max"])
+        for name, n in snapshot["counters"].items():
+            _counters[name] = _counters.get(name, 0) + n
+        for name, other in snapshot["histograms"].items():
+            histogram = _histograms.setdefault(name, {"le": other["le"], "counts": [0] * len(other["counts"]),
+                                                      "count": 0, "sum": 0.0})
+            histogram["counts"] = [a + b for a, b in zip(histogram["counts"], other["counts"])]
+            histogram["count"] += other["count"]
+            histogram["sum"] += other["sum"]
+
+
+def collecting(func, *args):
+    """
+    Runs func(*args) in a worker process and returns (result, drain()), so the
+    parent can merge() the worker's metrics. Top level, so it can be submitted to a pool.
+    """
+    return func(*args), drain() if ENABLED else None
+
+
+def emit(event, **fields):
+    """Writes one JSON line (PIPELINE_METRICS decides where)."""
+    if not ENABLED:
+        return
+    line = json.dumps({"event": event, "time": round(time.time(), 3), "pid": os.getpid(), **fields},
+                      default=str)
+    target = os.environ.get(METRICS_ENV, "")
+    if target in ("1", "true", "stderr"):
+        print(line, file=sys.stderr, flush=True)
+    else:
+        with open(target, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def stage(name):
+    """
+    Wraps one run of a pipeline stage (also usable as a decorator on its main):
+    starts from empty metrics, optionally profiles, and emits the stage line at the end.
+    """
+    if not ENABLED and PROFILE_DIR is None:
+        yield
+        return
+
+    drain()
+    profiler = cProfile.Profile() if PROFILE_DIR else None
+    status = "failed"
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+        status = "ok"
+    finally:
+        seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            profile_dir = Path(PROFILE_DIR)
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(profile_dir / f"{name}-{os.getpid()}.prof")
+        emit("stage", stage=name, status=status, seconds=round(seconds, 3), **drain())
@@ -0,0 +1,221 @@
+import json
+import os
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.utils import murmurhash3_32
+
+# Near-duplicate detection for cleaned articles (the Guardian republishes
+# updated versions of a story under new URLs), in near-linear time:
+#   - every article is a set of word shingles (3 consecutive words)
+#   - MinHash turns the set into NUM_PERM numbers; the share of equal numbers
+#     between two articles estimates the Jaccard similarity of their shingles
+#   - locality-sensitive hashing splits the signature into BANDS bands; only
+#     articles that agree on a whole band are compared at all
+# Articles are added in order and an article is a duplicate of the most similar
+# earlier original at or above the threshold, so the first version is kept (like
+# drop_duplicates). Only originals go into the band buckets.
+#
+# The index can be saved and loaded, so articles the collector adds later are
+# checked against everything seen before without recomputing any signature.
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+THRESHOLD = 0.8
+
+NO_KEY = -1
+_MAX_HASH = np.iinfo(np.uint32).max
+_SHINGLE_PRIME = np.uint64(1099511628211)
+
+
+class NearDuplicateIndex:
+    """
+    keys: an int64 per article (e.g. Pre-Processing.url_key of the url), so an
+    article that is added again gets its earlier answer. NO_KEY = not remembered.
+    version: what the texts were cleaned with; load() starts over when it differs.
+    """
+
+    def __init__(self, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS, shingle_size=SHINGLE_SIZE,
+                 seed=1, version=""):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.version = version
+
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash functions: odd multipliers, the high 32 bits are the hash
+        self.a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self.word_hashes = {}
+
+        self.size = 0
+        self.signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+        self.duplicate_of = np.zeros(1024, dtype=np.int64)
+        self.keys = np.zeros(1024, dtype=np.int64)
+        self.key_positions = {}
+        self.buckets = [{} for _ in range(bands)]
+
+    def params(self):
+        return {"threshold": self.threshold, "num_perm": self.num_perm, "bands": self.bands,
+                "shingle_size": self.shingle_size, "seed": self.seed, "version": self.version}
+
+    def add(self, keys, texts):
+        """
+        Adds a batch of articles in order. Returns, per article, the position of
+        the earlier article it duplicates, or -1 when it is an original.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        texts = list(texts)
+        result = np.full(len(texts), -1, dtype=np.int64)
+
+        # Signatures only for articles the index does not know yet
+        known = np.array([key != NO_KEY and key in self.key_positions for key in keys.tolist()], dtype=bool)
+        new = np.flatnonzero(~known)
+        signatures, has_shingles = self.signatures_of([texts[i] for i in new])
+        new_rows = dict(zip(new.tolist(), range(len(new))))
+
+        width = self.num_perm // self.bands * 4
+        for i, key in enumerate(keys.tolist()):
+            if key != NO_KEY and key in self.key_positions:
+                result[i] = self.duplicate_of[self.key_positions[key]]
+                continue
+            row = new_rows[i]
+            signature = signatures[row]
+            band_keys = None
+            duplicate_of = -1
+            if has_shingles[row]:
+                packed = signature.tobytes()
+                band_keys = [packed[band * width:(band + 1) * width] for band in range(self.bands)]
+                duplicate_of = self._most_similar(signature, band_keys)
+            result[i] = duplicate_of
+            self._append(key, signature, duplicate_of, band_keys)
+        return result
+
+    def signatures_of(self, texts):
+        """(len(texts) x num_perm MinHash signatures, which texts had at least one shingle)."""
+        k = self.shingle_size
+        splits = [text.split() for text in texts]
+        lengths = np.fromiter(map(len, splits), dtype=np.int64, count=len(splits))
+        words = list(chain.from_iterable(splits))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+        codes, uniques = pd.factorize(pd.Series(words, dtype=object))
+        cache = self.word_hashes
+        unique_hashes = np.array([cache[w] if w in cache else cache.setdefault(w, murmurhash3_32(w, positive=True))
+                                  for w in uniques], dtype=np.uint64)
+        hashes = unique_hashes[codes]
+
+        # Hash of the shingle starting at every word (uint64 arithmetic wraps around)
+        n_starts = max(len(words) - k + 1, 0)
+        shingles = np.zeros(n_starts, dtype=np.uint64)
+        for j in range(k):
+            shingles = shingles * _SHINGLE_PRIME + hashes[j:j + n_starts]
+
+        # ...keeping only the shingles that do not run into the next article
+        counts = np.maximum(lengths - k + 1, 0)
+        firsts = np.cumsum(counts) - counts
+        starts = np.repeat(offsets[:-1] - firsts, counts) + np.arange(counts.sum())
+        shingles = shingles[starts]
+
+        signatures = np.full((len(texts), self.num_perm), _MAX_HASH, dtype=np.uint32)
+        has_shingles = counts > 0
+        if has_shingles.any():
+            segments = firsts[has_shingles]
+            values = np.empty_like(shingles)
+            for p in range(self.num_perm):
+                np.multiply(shingles, self.a[p], out=values)
+                np.add(values, self.b[p], out=values)
+                np.right_shift(values, np.uint64(32), out=values)
+                signatures[has_shingles, p] = np.minimum.reduceat(values, segments)
+        return signatures, has_shingles
+
+    def clusters(self):
+        """{original position: [positions of its duplicates]}, originals with duplicates only."""
+        clusters = {}
+        for position in np.flatnonzero(self.duplicate_of[:self.size] >= 0).tolist():
+            clusters.setdefault(int(self.duplicate_of[position]), []).append(position)
+        return clusters
+
+    def cluster_sizes(self):
+        """Counter {cluster size (original included): number of clusters}."""
+        duplicates = self.duplicate_of[:self.size]
+        per_original = np.bincount(duplicates[duplicates >= 0], minlength=self.size)
+        return Counter((per_original[per_original > 0] + 1).tolist())
+
+    def save(self, path):
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, signatures=self.signatures[:self.size], duplicate_of=self.duplicate_of[:self.size],
+                     keys=self.keys[:self.size], params=np.array(json.dumps(self.params())))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, **params):
+        """
+        The saved index, or a new empty one (with params) when there is no file
+        or it was built with different params.
+        """
+        index = cls(**params)
+        path = Path(path)
+        if not path.exists():
+            return index
+        with np.load(path) as saved:
+            if json.loads(str(saved["params"])) != index.params():
+                print(f"Near-duplicate index {path.name} was built with other settings, starting over.")
+                return index
+            signatures, duplicate_of, keys = saved["signatures"], saved["duplicate_of"], saved["keys"]
+
+        index.size = len(keys)
+        index.signatures, index.duplicate_of, index.keys = signatures, duplicate_of, keys
+        index.key_positions = {key: position for position, key in enumerate(keys.tolist()) if key != NO_KEY}
+
+        # The buckets again, for the originals that had shingles
+        originals = np.flatnonzero((duplicate_of < 0) & (signatures != _MAX_HASH).any(axis=1))
+        packed = signatures[originals].tobytes()
+        width = index.num_perm // index.bands * 4
+        row_width = index.num_perm * 4
+        for row, position in enumerate(originals.tolist()):
+            offset = row * row_width
+            for bucket, band_start in zip(index.buckets, range(offset, offset + row_width, width)):
+                bucket.setdefault(packed[band_start:band_start + width], []).append(position)
+        return index
+
+    def _most_similar(self, signature, band_keys):
+        candidates = set()
+        for bucket, band_key in zip(self.buckets, band_keys):
+            candidates.update(bucket.get(band_key, ()))
+        best, best_similarity = -1, 0.0
+        # Sorted, so the earliest original wins a tie
+        for candidate in sorted(candidates):
+            similarity = np.count_nonzero(self.signatures[candidate] == signature) / self.num_perm
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+
+    def _append(self, key, signature, duplicate_of, band_keys):
+        if self.size == len(self.keys):
+            # A loaded index can be empty (a run that kept no articles), so never grow from 0
+            capacity = max(1024, 2 * len(self.keys))
+            self.signatures = np.resize(self.signatures, (capacity, self.num_perm))
+            self.duplicate_of = np.resize(self.duplicate_of, capacity)
+            self.keys = np.resize(self.keys, capacity)
+        position = self.size
+        self.signatures[position] = signature
+        self.duplicate_of[position] = duplicate_of
+        self.keys[position] = key
+        if key != NO_KEY:
+            self.key_positions[key] = position
+        # Only originals are looked up later: a duplicate's matches are its original's
+        if duplicate_of < 0 and band_keys is not None:
+            for bucket, band_key in zip(self.buckets, band_keys):
+                bucket.setdefault(band_key, []).append(position)
+        self.size += 1
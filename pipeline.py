@@ -0,0 +1,327 @@
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+# Runs the pipeline scripts as a DAG of stages instead of by hand:
+#
+#   collect -> sense -> preprocess -> features -> report
+#
+# Every stage declares its input and output paths and the parameters that
+# change its result. Its fingerprint is a hash of the parameters, the stat of
+# its inputs and the source of the modules it runs. A stage is skipped when
+# its fingerprint matches the last successful run and its outputs have not
+# been touched since, so changing max_features reruns features only.
+# Stages whose dependencies are done run in parallel.
+#
+# The fingerprints of the last runs are kept in <project dir>/pipeline_state.json.
+
+ROOT = Path(__file__).resolve().parent
+PROJECT_DIR = Path(r"C:\Users\yuval\Desktop\לימודים\ML")
+STATE_FILE = "pipeline_state.json"
+MAX_WORKERS = 2
+
+# collect talks to the Guardian API, so it only runs when asked for (--collect)
+ON_REQUEST = {"collect"}
+
+
+def project_paths(project_dir):
+    project_dir = Path(project_dir)
+    data_dir = project_dir / "data"
+    return {
+        "project_dir": project_dir,
+        "data_dir": data_dir,
+        "corpus_dir": data_dir / "corpus",
+        "sensed_file": project_dir / "sensed_data.csv",
+        "processed_file": project_dir / "processed_data_separated.csv",
+        "tokens_dir": project_dir / "processed_tokens",
+        "clean_cache": project_dir / "clean_cache.sqlite",
+        "near_dup_file": project_dir / "near_duplicates.npz",
+        "features_dir": project_dir / "features",
+        "model_dir": project_dir / "models",
+    }
+
+
+def load_module(file_name):
+    """Imports a pipeline script by file name (Pre-Processing.py cannot be imported by name)."""
+    path = ROOT / file_name
+    name = path.stem.replace("-", "_")
+    # Registered like a normal import, so process pools can pickle its functions by name
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- Stage bodies (top level, so they can run in a worker process) ---
+
+def run_collect(paths, params):
+    from datetime import date
+    data_collection = load_module("data_collection.py")
+    from_date = date.fromisoformat(params["from_date"]) if params["from_date"] else None
+    to_date = date.fromisoformat(params["to_date"]) if params["to_date"] else None
+    base_url = params["base_url"] or data_collection.BASE_URL
+    data_collection.main(base_url, paths["data_dir"], mode=params["mode"], from_date=from_date, to_date=to_date)
+
+
+def run_sense(paths, params):
+    sensing = load_module("sensing.py")
+    sensing.main(paths["data_dir"], paths["corpus_dir"], paths["sensed_file"], workers=params["workers"])
+
+
+def run_preprocess(paths, params):
+    pre_processing = load_module("Pre-Processing.py")
+    pre_processing.main(paths["sensed_file"], paths["processed_file"], cache_file=paths["clean_cache"],
+                        tokens_dir=paths["tokens_dir"], near_dup_file=paths["near_dup_file"])
+
+
+def run_features(paths, params):
+    feature_extraction = load_module("feature_extraction_2.py")
+    feature_extraction.main(paths["processed_file"], paths["features_dir"], paths["model_dir"],
+                            text_mode=params["text_mode"], tokens_dir=paths["tokens_dir"],
+                            trail_features=params["trail_features"], tag_features=params["tag_features"],
+                            workers=params["workers"])
+
+
+def run_report(paths, params):
+    yuval_feature = load_module("yuval_feature.py")
+    yuval_feature.main(paths["processed_file"], paths["model_dir"], paths["features_dir"])
+
+
+class Stage:
+
+    def __init__(self, name, run, deps, inputs, outputs, params, modules, fingerprint_params=None):
+        self.name = name
+        self.run = run
+        self.deps = deps
+        # inputs: paths, or (directory, glob pattern) to look at only some files of a directory
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params
+        self.modules = modules
+        # Parameters that change the result; the rest (e.g. worker counts) do not rerun a stage
+        self.fingerprint_params = params if fingerprint_params is None else fingerprint_params
+
+    def fingerprint(self):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps([self.name, self.fingerprint_params], sort_keys=True, default=str).encode())
+        for module in self.modules:
+            digest.update((ROOT / module).read_bytes())
+        digest.update(json.dumps(stat_paths(self.inputs)).encode())
+        return digest.hexdigest()
+
+
+def build_stages(paths, collect_mode="incremental", from_date=None, to_date=None, workers=None,
+                 text_mode=None, trail_features=None, tag_features=None, base_url=None):
+    """The five stages for one project directory. None keeps a script's own default."""
+    # Imported here, the stopword lists are part of what the cleaning and feature stages compute
+    from clean_cache import stop_words_version
+    from feature_pipeline import TAG_STOP_WORDS
+    from text_cleaning import STOP_WORDS
+
+    sense_workers = workers or os.cpu_count() or 1
+    feature_params = {"text_mode": text_mode or "tfidf", "trail_features": trail_features or 1000,
+                      "tag_features": tag_features or 500}
+
+    return [
+        Stage("collect", run_collect, [], [],
+              [paths["corpus_dir"]],
+              {"mode": collect_mode, "from_date": from_date, "to_date": to_date, "base_url": base_url},
+              ["data_collection.py", "corpus_store.py", "crawl_state.py"],
+              # Fetching is never up to date: new articles keep being published
+              {"requested_at": time.time()}),
+        Stage("sense", run_sense, ["collect"],
+              [(paths["data_dir"], "*/*.txt"), paths["corpus_dir"]],
+              [paths["sensed_file"]],
+              {"workers": sense_workers},
+              ["sensing.py", "sensing_manifest.py", "corpus_store.py", "metrics.py"],
+              {}),
+        Stage("preprocess", run_preprocess, ["sense"],
+              [paths["sensed_file"]],
+              [paths["processed_file"], paths["tokens_dir"]],
+              {"stop_words": stop_words_version(STOP_WORDS)},
+              ["Pre-Processing.py", "text_cleaning.py", "token_store.py", "near_duplicates.py", "clean_cache.py",
+               "schema.py", "metrics.py"]),
+        Stage("features", run_features, ["preprocess"],
+              [paths["processed_file"], paths["tokens_dir"]],
+              [paths["features_dir"], paths["model_dir"] / "feature_pipeline.joblib"],
+              {**feature_params, "workers": sense_workers},
+              ["feature_extraction_2.py", "feature_pipeline.py", "hashing_features.py", "token_store.py",
+               "feature_store.py", "feature_analysis.py", "text_cleaning.py", "schema.py", "metrics.py"],
+              {**feature_params, "tag_stop_words": hashlib.blake2b("\n".join(TAG_STOP_WORDS).encode()).hexdigest()}),
+        # The report reads the fitted pipeline and feature store instead of refitting TF-IDF
+        Stage("report", run_report, ["features"],
+              [paths["features_dir"], paths["model_dir"] / "feature_pipeline.joblib"],
+              [],
+              {},
+              ["yuval_feature.py", "feature_analysis.py", "feature_pipeline.py", "feature_store.py", "schema.py",
+               "metrics.py"]),
+    ]
+
+
+def stat_paths(paths):
+    """[(path, size, mtime_ns)] of every file under the given paths, sorted."""
+    stats = []
+    for item in paths:
+        root, pattern = item if isinstance(item, tuple) else (item, "**/*")
+        root = Path(root)
+        if root.is_file():
+            files = [root]
+        elif root.is_dir():
+            files = [p for p in root.glob(pattern) if p.is_file()]
+        else:
+            stats.append([str(root), None, None])
+            continue
+        for p in files:
+            st = p.stat()
+            # Lists, like they come back from pipeline_state.json
+            stats.append([str(p), st.st_size, st.st_mtime_ns])
+    return sorted(stats)
+
+
+def load_state(project_dir):
+    path = Path(project_dir) / STATE_FILE
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(project_dir, state):
+    path = Path(project_dir) / STATE_FILE
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def stale_reason(stage, state, fingerprint):
+    """Why the stage has to run, or None when its outputs are up to date."""
+    previous = state.get(stage.name)
+    if previous is None:
+        return "never ran"
+    if previous["fingerprint"] != fingerprint:
+        return "inputs, parameters or code changed"
+    if any(not Path(p).exists() for p in stage.outputs):
+        return "output missing"
+    if previous["outputs"] != stat_paths(stage.outputs):
+        return "outputs changed since the last run"
+    return None
+
+
+def run_pipeline(stages, project_dir, targets=None, force=(), max_workers=MAX_WORKERS, dry_run=False):
+    """
+    Runs the targets (default: every stage not in ON_REQUEST) and the stages they
+    depend on, skipping the up-to-date ones. Returns {stage name: "ran" / "skipped" / "failed"}.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    targets = list(targets or [s.name for s in stages if s.name not in ON_REQUEST])
+    unknown = sorted((set(targets) | set(force)) - set(by_name))
+    if unknown:
+        raise ValueError(f"unknown stage(s): {', '.join(unknown)} (stages: {', '.join(by_name)})")
+
+    # The targets plus their dependencies, except on-request stages nobody asked for
+    wanted = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name in wanted or (name in ON_REQUEST and name not in targets):
+            continue
+        wanted.add(name)
+        todo.extend(by_name[name].deps)
+
+    project_dir = Path(project_dir)
+    project_dir.mkdir(parents=True, exist_ok=True)
+    state = load_state(project_dir)
+    results = {}
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while len(results) < len(wanted):
+            for name in [s.name for s in stages if s.name in wanted]:
+                stage = by_name[name]
+                if name in results or name in [n for n, _, _ in running.values()]:
+                    continue
+                deps = [d for d in stage.deps if d in wanted]
+                if any(results.get(d) == "failed" for d in deps):
+                    results[name] = "failed"
+                    print(f"[pipeline] {name}: not run, a dependency failed")
+                    continue
+                if any(d not in results for d in deps):
+                    continue
+
+                # Checked only once the dependencies are done, their outputs are our inputs
+                fingerprint = stage.fingerprint()
+                reason = "forced" if name in force else stale_reason(stage, state, fingerprint)
+                if reason is None:
+                    results[name] = "skipped"
+                    print(f"[pipeline] {name}: up to date")
+                elif dry_run:
+                    results[name] = "ran"
+                    print(f"[pipeline] {name}: would run ({reason})")
+                else:
+                    print(f"[pipeline] {name}: running ({reason})")
+                    future = pool.submit(stage.run, project_paths(project_dir), stage.params)
+                    running[future] = (name, fingerprint, time.perf_counter())
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint, started = running.pop(future)
+                stage = by_name[name]
+                elapsed = time.perf_counter() - started
+                if future.exception() is not None:
+                    results[name] = "failed"
+                    print(f"[pipeline] {name}: failed after {elapsed:.1f}s: {future.exception()!r}")
+                    continue
+                results[name] = "ran"
+                # The fingerprint of the inputs as they were when the stage started
+                state[name] = {"fingerprint": fingerprint, "outputs": stat_paths(stage.outputs)}
+                save_state(project_dir, state)
+                print(f"[pipeline] {name}: done in {elapsed:.1f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pipeline stages that are out of date")
+    parser.add_argument("targets", nargs="*", help="stages to bring up to date (default: all but collect)")
+    parser.add_argument("--project-dir", type=Path, default=PROJECT_DIR)
+    parser.add_argument("--collect", action="store_true", help="also fetch new articles first")
+    parser.add_argument("--collect-mode", choices=["pages", "incremental", "backfill"], default="incremental")
+    parser.add_argument("--base-url", help="API endpoint, e.g. a stub_guardian_server")
+    parser.add_argument("--from-date", help="backfill start (YYYY-MM-DD)")
+    parser.add_argument("--to-date", help="backfill end (YYYY-MM-DD)")
+    parser.add_argument("--force", nargs="*", default=[], help="stages to run even if up to date")
+    parser.add_argument("--workers", type=int, help="sensing worker processes (and feature block fitting)")
+    parser.add_argument("--max-parallel", type=int, default=MAX_WORKERS, help="stages run at the same time")
+    parser.add_argument("--text-mode", choices=["tfidf", "hashing"])
+    parser.add_argument("--trail-features", type=int)
+    parser.add_argument("--tag-features", type=int)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    paths = project_paths(args.project_dir)
+    stages = build_stages(paths, args.collect_mode, args.from_date, args.to_date, args.workers,
+                          args.text_mode, args.trail_features, args.tag_features, args.base_url)
+    targets = args.targets or None
+    if args.collect:
+        targets = (targets or [s.name for s in stages if s.name not in ON_REQUEST]) + ["collect"]
+
+    try:
+        results = run_pipeline(stages, args.project_dir, targets, set(args.force), args.max_parallel, args.dry_run)
+    except ValueError as e:
+        parser.error(str(e))
+    print("[pipeline] " + ", ".join(f"{name}: {result}" for name, result in results.items()))
+
+
+if __name__ == "__main__":
+    main()
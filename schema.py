@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# Column types of the article CSVs the stages hand to each other
+# (sensed_data.csv, processed_data_separated.csv), applied when they are read
+# instead of pandas' defaults (a Python string object per cell):
+#   - label and author are categoricals: a few sections and a few thousand
+#     authors repeated over every row, kept as small integer codes
+#   - date is parsed to datetime64 ("Unknown" and other bad dates become NaT)
+#   - the text columns and url stay strings
+#   - body, by far the largest column, is only read by the stages that need it
+# Feature values are FEATURE_DTYPE (the TF-IDF weights) and FLAG_DTYPE (the 0/1
+# author columns), in memory as well as in the feature store and model bundle.
+
+ARTICLE_COLUMNS = ['label', 'title', 'trail_text', 'tags', 'date', 'author', 'body', 'url']
+CATEGORY_COLUMNS = ['label', 'author']
+DATE_COLUMNS = ['date']
+BODY_COLUMN = 'body'
+
+FEATURE_DTYPE = np.float32
+FLAG_DTYPE = np.uint8
+
+
+def article_dtypes(columns):
+    """read_csv dtype= for columns: categoricals, everything else str."""
+    return {column: 'category' if column in CATEGORY_COLUMNS else str for column in columns}
+
+
+def parse_dates(df):
+    """The date columns of df as datetime64, in place; returns df."""
+    for column in DATE_COLUMNS:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], errors='coerce', format='ISO8601')
+    return df
+
+
+def read_articles(path, columns=None, with_body=False, dates=True, chunksize=None):
+    """
+    An article CSV with the schema above.
+    columns: the columns to read, default every column of the file (without
+    body unless with_body). dates=False keeps the dates as the strings in the file.
+    chunksize: like read_csv, an iterator of frames of that many rows.
+    """
+    if columns is None:
+        header = pd.read_csv(path, nrows=0).columns
+        columns = [column for column in header if with_body or column != BODY_COLUMN]
+    frames = pd.read_csv(path, usecols=columns, dtype=article_dtypes(columns), chunksize=chunksize)
+    if not dates:
+        return frames
+    if chunksize:
+        return (parse_dates(frame) for frame in frames)
+    return parse_dates(frames)
+
+
+def fill_category(column, value):
+    """fillna(value) for a column that may be categorical (value is added as a category first)."""
+    if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+        column = column.cat.add_categories([value])
+    return column.fillna(value)
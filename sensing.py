@@ -1,13 +1,34 @@
+import argparse
 import csv
 import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import metrics
+from corpus_store import CorpusStore, migrate_text_tree, read_range
+from sensing_manifest import SensingManifest
+
 # --- הגדרות נתיבים ---
 PROJECT_DIR = Path(r"C:\Users\yuval\Desktop\לימודים\ML")
 DATA_DIR = PROJECT_DIR / "data"
+# המאגר המשורד שאליו data_collection כותב (project_dir / "corpus" שם)
+CORPUS_DIR = DATA_DIR / "corpus"
 OUTPUT_FILE = PROJECT_DIR / "sensed_data.csv"
 
+FIELDNAMES = ["label", "title", "trail_text", "tags", "date", "author", "body", "url"]
+
+# --- הגדרות ריצה מקבילית ---
+WORKERS = os.cpu_count() or 1
+FILES_PER_TASK = 500  # קבצי .txt בכל משימה
+RECORDS_PER_TASK = 2000  # רשומות מהמאגר בכל משימה
+WRITE_BATCH_SIZE = 1000  # שורות שנכתבות ל-CSV בכל פעם
+
+# מה כבר עובד בריצה הקודמת (ראו sensing_manifest.py), נשמר ליד קובץ הפלט
+MANIFEST_SUFFIX = ".manifest.sqlite"
 
+
+@metrics.timed("sense.parse_file")
 def parse_article_file(file_path):
     """
     פונקציה שמבצעת את ה"חישה" (Sensing):
@@ -15,7 +36,22 @@ def parse_article_file(file_path):
     """
     try:
         # קריאת הקובץ
-        content = file_path.read_text(encoding="utf-8")
+        with metrics.timer("sense.read_file"):
+            content = file_path.read_text(encoding="utf-8")
+        metrics.count("sense.files_read")
+        metrics.count("sense.chars_read", len(content))
+        return parse_article_text(content)
+
+    except Exception as e:
+        print(f"Error parsing file {file_path.name}: {e}")
+        return None
+
+
+def parse_article_text(content):
+    """
+    הפירוק עצמו, על הטקסט של כתבה אחת (מקובץ .txt או מרשומה במאגר המשורד).
+    """
+    try:
         lines = content.splitlines()
 
         # בדיקה שהקובץ מכיל את כל השורות הנדרשות (לפי הפורמט שיצרנו)
@@ -59,61 +95,288 @@ def parse_article_file(file_path):
         }
 
     except Exception as e:
-        print(f"Error parsing file {file_path.name}: {e}")
+        print(f"Error parsing article: {e}")
         return None
 
 
-def main():
-    print("--- Starting Static Sensing Process ---")
+def record_to_row(record):
+    """
+    רשומה מובנית מהמאגר -> שורה בטבלה, בלי פירוק טקסט לפי מספרי שורות.
+    """
+    return {
+        "date": record["date"],
+        "author": record["author"],
+        "url": record["url"],
+        "tags": ", ".join(record["tags"]),
+        "title": record["title"],
+        "trail_text": record["trail_text"],
+        "body": record["body"]
+    }
+
+
+def iter_tasks(data_dir, corpus_dir):
+    """
+    מחלקת את הקורפוס ליחידות עבודה קטנות ועצמאיות:
+    ("store", label, shard, start, end) לטווח במאגר המשורד,
+    ("files", label, [paths]) לקבוצת קבצים בעץ הישן.
+    """
+    tasks, _, _ = plan_tasks(data_dir, corpus_dir, {})
+    return tasks
+
+
+def plan_tasks(data_dir, corpus_dir, known):
+    """
+    משווה את הקורפוס למניפסט של הריצה הקודמת (known = {source: (size, mtime)}).
+    מחזירה (tasks, stale, stats):
+    tasks - משימות רק עבור מידע חדש או שהשתנה,
+    stale - מקורות שהשורות הישנות שלהם צריכות לצאת מה-CSV (נמחקו או השתנו),
+    stats - {source: (size, mtime)} כפי שיירשמו במניפסט אחרי הריצה.
+    """
+    tasks, stale, stats = [], [], {}
+    current = set()
+
+    if (corpus_dir / "index.tsv").exists():
+        # כתבות .txt מהמבנה הישן שעוד לא בחנות (נאספו לפני שהאיסוף עבר לחנות) מועברות אליה קודם,
+        # אחרת הן היו נעלמות מה-CSV. כתבה שכבר בחנות מדולגת בלי לקרוא את הקובץ
+        migrated = migrate_text_tree(data_dir, corpus_dir)
+        if migrated:
+            print(f"Moved {migrated} articles from {data_dir}/<category>/*.txt into the corpus store")
+        print(f"Streaming articles from corpus store: {corpus_dir}")
+        store = CorpusStore(corpus_dir)
+
+        # השארדים רק גדלים, אז ממשיכים מהמקום שבו עצרנו בפעם הקודמת
+        min_offsets = {}
+        for shard in store.shards():
+            source = str(shard)
+            current.add(source)
+            if source in known:
+                if known[source][0] <= shard.stat().st_size:
+                    min_offsets[source] = known[source][0]
+                else:
+                    stale.append(source)  # השארד נכתב מחדש, קוראים אותו מההתחלה
+
+        for label, shard, start, end in store.member_ranges(RECORDS_PER_TASK, min_offsets):
+            tasks.append(("store", label, str(shard), start, end))
+            stats[str(shard)] = (end, shard.stat().st_mtime)
+    else:
+        # מעבר על התיקיות (כל תיקייה היא Label)
+        for category_dir in data_dir.iterdir():
+            if category_dir.is_dir():
+                label = category_dir.name  # ה-Label נגזר משם התיקייה
+
+                changed = []
+                for file_path in category_dir.glob("*.txt"):
+                    source = str(file_path)
+                    current.add(source)
+                    file_stat = file_path.stat()
+                    stat_key = (file_stat.st_size, file_stat.st_mtime)
+                    if known.get(source) == stat_key:
+                        continue
+                    if source in known:
+                        stale.append(source)
+                    changed.append(source)
+                    stats[source] = stat_key
+
+                # FILES_PER_TASK קבצים בכל משימה
+                for i in range(0, len(changed), FILES_PER_TASK):
+                    tasks.append(("files", label, changed[i:i + FILES_PER_TASK]))
+
+    # קבצים/שארדים שנמחקו מאז הריצה הקודמת
+    stale.extend(source for source in known if source not in current)
+    return tasks, stale, stats
+
+
+def sense_task(task):
+    """
+    מריצה יחידת עבודה אחת (גם בתוך תהליך נפרד) ומחזירה (label, rows).
+    """
+    kind, label = task[0], task[1]
+    rows = []
 
-    if not DATA_DIR.exists():
-        print(f"Error: Data directory not found at {DATA_DIR}")
+    if kind == "files":
+        articles = ((path, parse_article_file(Path(path))) for path in task[2])
+    else:
+        # רשומות ישנות (שהועברו מקבצי .txt לפני השינוי) עדיין מכילות טקסט גולמי
+        articles = ((task[2], parse_article_text(r["text"]) if "text" in r else record_to_row(r))
+                    for r in read_range(*task[2:]))
+
+    for source, article_data in articles:
+        if article_data:
+            # הוספת ה-Label (חובה לפי ההוראות)
+            article_data["label"] = label
+            # המקור נשמר רק למניפסט, הוא לא נכתב ל-CSV
+            article_data["_source"] = source
+            rows.append(article_data)
+    return label, rows
+
+
+def run_tasks(tasks, workers):
+    """
+    מחזירה את התוצאות לפי סדר המשימות.
+    לכל היותר 2 * workers משימות פתוחות בכל רגע, כך שהזיכרון לא תלוי בגודל הקורפוס.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield sense_task(task)
         return
 
-    all_articles = []
-    categories_found = []
+    def result(future):
+        # המדדים של תהליך העבודה חוזרים יחד עם התוצאה (רק כש-PIPELINE_METRICS פעיל)
+        if not metrics.ENABLED:
+            return future.result()
+        task_result, worker_metrics = future.result()
+        metrics.merge(worker_metrics)
+        return task_result
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = deque()
+        for task in tasks:
+            if metrics.ENABLED:
+                window.append(pool.submit(metrics.collecting, sense_task, task))
+            else:
+                window.append(pool.submit(sense_task, task))
+            if len(window) >= 2 * workers:
+                yield result(window.popleft())
+        while window:
+            yield result(window.popleft())
 
-    # מעבר על התיקיות (כל תיקייה היא Label)
-    for category_dir in DATA_DIR.iterdir():
-        if category_dir.is_dir():
-            label = category_dir.name  # ה-Label נגזר משם התיקייה
-            categories_found.append(label)
+
+def iter_labeled_articles(data_dir=DATA_DIR, corpus_dir=CORPUS_DIR, workers=1):
+    """
+    מחזירה (label, article_data) לכל כתבה.
+    אם קיים מאגר משורד קוראים ממנו ברצף, אחרת מהעץ הישן של קובץ לכל כתבה.
+    """
+    for label, rows in run_tasks(iter_tasks(data_dir, corpus_dir), workers):
+        for article_data in rows:
+            yield label, article_data
+
+
+def write_rows(writer, results, new_rows):
+    """
+    כותבת את תוצאות המשימות ל-CSV, WRITE_BATCH_SIZE שורות בכל פעם.
+    new_rows מתמלא ב-{source: [(label, url), ...]} עבור המניפסט.
+    """
+    total = 0
+    current_label = None
+    batch = []
+
+    for label, rows in results:
+        if label != current_label:
+            current_label = label
             print(f"Processing Label: {label}...")
 
-            # מעבר על כל הקבצים בתיקייה
-            files = list(category_dir.glob("*.txt"))
-            for file_path in files:
-                article_data = parse_article_file(file_path)
+        for row in rows:
+            new_rows.setdefault(row["_source"], []).append((row["label"], row["url"]))
+        batch.extend(rows)
+        if len(batch) >= WRITE_BATCH_SIZE:
+            with metrics.timer("sense.write_csv"):
+                writer.writerows(batch)
+            total += len(batch)
+            batch = []
+
+    with metrics.timer("sense.write_csv"):
+        writer.writerows(batch)
+    total += len(batch)
+    metrics.count("sense.rows_written", total)
+    return total
+
 
-                if article_data:
-                    # הוספת ה-Label (חובה לפי ההוראות)
-                    article_data["label"] = label
-                    all_articles.append(article_data)
+def copy_kept_rows(old_file, writer, removed_keys):
+    """
+    מעתיקה את השורות הקיימות, חוץ מהשורות של מקורות שנמחקו או השתנו.
+    """
+    kept = 0
+    with open(old_file, encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            key = (row["label"], row["url"])
+            if removed_keys[key] > 0:
+                removed_keys[key] -= 1
+                continue
+            writer.writerow(row)
+            kept += 1
+    return kept
+
+
+@metrics.stage("sense")
+def main(data_dir=DATA_DIR, corpus_dir=CORPUS_DIR, output_file=OUTPUT_FILE, workers=WORKERS, incremental=True):
+    """
+    incremental=True מעבדת רק קבצים/רשומות שנוספו או השתנו מאז הריצה הקודמת
+    ומעדכנת את ה-CSV הקיים. incremental=False בונה אותו מחדש.
+    """
+    print(f"--- Starting Static Sensing Process ({workers} workers) ---")
+
+    if not data_dir.exists():
+        print(f"Error: Data directory not found at {data_dir}")
+        return
+
+    # הגדרת העמודות בטבלה (כולל ה-Label וכל מרכיבי הכתבה)
+    fieldnames = FIELDNAMES
+    manifest_file = output_file.with_name(output_file.stem + MANIFEST_SUFFIX)
 
-    # שמירה לקובץ CSV
-    if all_articles:
-        # הגדרת העמודות בטבלה (כולל ה-Label וכל מרכיבי הכתבה)
-        fieldnames = ["label", "title", "trail_text", "tags", "date", "author", "body", "url"]
+    with SensingManifest(manifest_file) as manifest:
+        full = not incremental or not output_file.exists() or manifest.is_empty()
+        known = {} if full else manifest.sources()
 
+        tasks, stale, stats = plan_tasks(data_dir, corpus_dir, known)
+        if not full and not tasks and not stale:
+            print("Nothing changed since the last run, sensed data is up to date.")
+            return
+
+        removed_keys = Counter(manifest.row_keys(stale))
+        new_rows = {}
+        kept = 0
+        print(f"{'Full rebuild' if full else 'Incremental update'}: "
+              f"{len(tasks)} tasks, {len(stale)} changed/deleted sources.")
+
+        # שמירה לקובץ CSV תוך כדי ריצה
         try:
-            with open(OUTPUT_FILE, mode='w', encoding='utf-8', newline='') as csv_file:
-                writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+            if full or removed_keys:
+                # כותבים לקובץ זמני ומחליפים בסוף, כדי שקובץ חצי-כתוב לא יחליף את הקודם
+                target = output_file.with_name(output_file.name + ".tmp")
+                mode = 'w'
+            else:
+                # רק תוספות: מוסיפים לסוף הקובץ הקיים
+                target = output_file
+                mode = 'a'
 
-                # כתיבת כותרות העמודות
-                writer.writeheader()
+            with open(target, mode=mode, encoding='utf-8', newline='') as csv_file:
+                writer = csv.DictWriter(csv_file, fieldnames=fieldnames, extrasaction='ignore')
 
-                # כתיבת השורות
-                writer.writerows(all_articles)
+                if mode == 'w':
+                    # כתיבת כותרות העמודות
+                    writer.writeheader()
+                    if not full:
+                        kept = copy_kept_rows(output_file, writer, removed_keys)
 
-            print(f"\nSuccess! Sensed Data created at: {OUTPUT_FILE}")
-            print(f"Total samples processed: {len(all_articles)}")
-            print(f"Columns created: {fieldnames}")
+                added = write_rows(writer, run_tasks(tasks, workers), new_rows)
+
+            if target != output_file:
+                os.replace(target, output_file)
 
         except Exception as e:
             print(f"Error writing CSV: {e}")
-    else:
+            return
+
+        if full:
+            manifest.clear()
+        manifest.apply(stale, stats, new_rows)
+
+    if full and not added:
+        os.remove(output_file)
+        manifest_file.unlink()
         print("No articles found. Please check the data collection step.")
+        return
+
+    print(f"\nSuccess! Sensed Data created at: {output_file}")
+    print(f"New or changed samples processed: {added}")
+    if mode == 'w':
+        print(f"Total samples: {kept + added}")
+    print(f"Columns created: {fieldnames}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Sensing: articles -> sensed_data.csv")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="processes parsing in parallel (1 = no pool)")
+    parser.add_argument("--full", action="store_true", help="rebuild sensed_data.csv instead of updating it")
+    args = parser.parse_args()
+    main(workers=args.workers, incremental=not args.full)
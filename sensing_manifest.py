@@ -0,0 +1,74 @@
+import sqlite3
+
+# What the last sensing run already turned into rows of sensed_data.csv:
+#   sources  - one line per .txt file or store shard: size (for a shard, the
+#              byte offset sensed so far) and mtime at the time it was sensed
+#   rows     - the (label, url) of every CSV row each source produced, so the
+#              rows of a changed or deleted source can be dropped from the CSV
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rows (
+    source TEXT NOT NULL,
+    label TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rows_source ON rows (source);
+"""
+
+
+class SensingManifest:
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_empty(self):
+        return self.conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0] == 0
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM sources")
+            self.conn.execute("DELETE FROM rows")
+
+    def sources(self):
+        """{source: (size, mtime)} as of the last run."""
+        return {source: (size, mtime) for source, size, mtime in
+                self.conn.execute("SELECT source, size, mtime FROM sources")}
+
+    def row_keys(self, sources):
+        """(label, url) of every row produced by the given sources."""
+        keys = []
+        for source in sources:
+            keys.extend(self.conn.execute("SELECT label, url FROM rows WHERE source = ?", (source,)))
+        return keys
+
+    def apply(self, removed, updated, new_rows):
+        """
+        Records one finished run in a single transaction.
+        removed: sources whose rows were dropped from the CSV,
+        updated: {source: (size, mtime)}, new_rows: {source: [(label, url), ...]}.
+        """
+        with self.conn:
+            for source in removed:
+                self.conn.execute("DELETE FROM rows WHERE source = ?", (source,))
+                self.conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+            self.conn.executemany("INSERT OR REPLACE INTO sources (source, size, mtime) VALUES (?, ?, ?)",
+                                  [(source, size, mtime) for source, (size, mtime) in updated.items()])
+            self.conn.executemany("INSERT INTO rows (source, label, url) VALUES (?, ?, ?)",
+                                  [(source, label, url) for source, keys in new_rows.items()
+                                   for label, url in keys])
@@ -0,0 +1,152 @@
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from synthetic_corpus import SECTIONS, START_DATE, make_api_article
+
+# Local stand-in for the Guardian /search endpoint, so data_collection can be
+# run and measured without a real API key. Point data_collection.main(base_url=...)
+# at http://127.0.0.1:<port>/search
+
+
+class GuardianStubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path != "/search":
+            return self._send(404, {"message": "Not found"})
+
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        server = self.server
+        api_key = params.get("api-key", "")
+
+        with server.lock:
+            server.request_counts[api_key] += 1
+            used = server.request_counts[api_key]
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        # Quota per key, like the real developer keys
+        if server.quota is not None and used > server.quota:
+            with server.lock:
+                server.rejected_counts[api_key] += 1
+            return self._send(429, {"message": "API rate limit exceeded"})
+
+        section = params.get("section", "news")
+        if section not in SECTIONS:
+            return self._send(200, self._page_body([], 1, 0, 1))
+
+        page = int(params.get("page", 1))
+        page_size = int(params.get("page-size", 10))
+
+        # Synthetic article i is published START_DATE + i hours, so a date window is an index range
+        first, last = self._index_range(params, server.articles_per_section)
+        total = max(0, last - first + 1)
+        pages = max(1, -(-total // page_size))
+
+        if page > pages:
+            return self._send(400, {"response": {
+                "status": "error",
+                "message": "requested page is beyond the number of available pages"}})
+
+        with server.lock:
+            server.page_log.append((api_key, section, page))
+
+        offset = (page - 1) * page_size
+        if params.get("order-by", "newest") == "oldest":
+            indexes = range(first + offset, min(last + 1, first + offset + page_size))
+        else:
+            # order-by=newest: page 1 holds the highest indexes
+            indexes = range(last - offset, max(first - 1, last - offset - page_size), -1)
+        results = [make_api_article(section, i, seed=server.seed) for i in indexes]
+        return self._send(200, self._page_body(results, page, total, pages, page_size))
+
+    def _index_range(self, params, articles_per_section):
+        first, last = 0, articles_per_section - 1
+        if "from-date" in params:
+            start = datetime.strptime(params["from-date"][:10], "%Y-%m-%d")
+            first = max(first, -(-int((start - START_DATE).total_seconds()) // 3600))
+        if "to-date" in params:
+            # to-date is inclusive of the whole day
+            end = datetime.strptime(params["to-date"][:10], "%Y-%m-%d") + timedelta(days=1)
+            last = min(last, -(-int((end - START_DATE).total_seconds()) // 3600) - 1)
+        return first, last
+
+    def _page_body(self, results, page, total, pages, page_size=10):
+        return {"response": {
+            "status": "ok",
+            "userTier": "developer",
+            "total": total,
+            "startIndex": (page - 1) * page_size + 1,
+            "pageSize": page_size,
+            "currentPage": page,
+            "pages": pages,
+            "orderBy": "newest",
+            "results": results,
+        }}
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep the console quiet, the collector prints its own progress
+        pass
+
+
+def make_server(host="127.0.0.1", port=0, articles_per_section=1000, quota=None, latency=0.0, seed=0):
+    """
+    Creates (but does not start) the stub server. port=0 picks a free port,
+    read it back from server.server_address.
+    """
+    server = ThreadingHTTPServer((host, port), GuardianStubHandler)
+    server.daemon_threads = True
+    server.articles_per_section = articles_per_section
+    server.quota = quota
+    server.latency = latency
+    server.seed = seed
+    server.lock = threading.Lock()
+    server.request_counts = Counter()
+    server.rejected_counts = Counter()
+    server.page_log = []
+    return server
+
+
+def start_in_background(**kwargs):
+    """Starts the stub on a daemon thread and returns (server, base_url)."""
+    server = make_server(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/search"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Guardian /search endpoint")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--articles-per-section", type=int, default=1000)
+    parser.add_argument("--quota", type=int, default=None, help="requests per key before answering 429")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    server = make_server(port=args.port, articles_per_section=args.articles_per_section,
+                         quota=args.quota, latency=args.latency)
+    print(f"Guardian stub listening on http://127.0.0.1:{args.port}/search")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate, product
+
+# Guardian sections we collect, as the API names them
+SECTIONS = ['news', 'sport', 'commentisfree', 'culture']
+
+SECTION_NAMES = {
+    'news': 'News',
+    'sport': 'Sport',
+    'commentisfree': 'Opinion',
+    'culture': 'Culture',
+}
+
+# A small vocabulary per section so the synthetic labels are actually learnable
+SECTION_WORDS = {
+    'news': ['government', 'minister', 'election', 'police', 'court', 'policy', 'parliament', 'economy'],
+    'sport': ['match', 'goal', 'league', 'coach', 'season', 'player', 'championship', 'victory'],
+    'commentisfree': ['argue', 'should', 'society', 'believe', 'debate', 'future', 'values', 'opinion'],
+    'culture': ['film', 'album', 'theatre', 'novel', 'artist', 'review', 'festival', 'gallery'],
+}
+
+COMMON_WORDS = ['the', 'and', 'this', 'that', 'with', 'from', 'week', 'after', 'about', 'years',
+                'first', 'last', 'people', 'said', 'report', 'world', 'time', 'city', 'new', 'country']
+
+START_DATE = datetime(2024, 1, 1)
+
+# A long tail of made-up words with Zipf-like frequencies, so vocabulary sizes
+# (TfidfVectorizer max_features, hashing, caches) behave like on real text
+SYLLABLES = ['ba', 'ke', 'lo', 'mi', 'nu', 'ra', 'se', 'ti', 'vo', 'za', 'do', 'fe', 'gu', 'ha', 'pi']
+LEXICON = ["".join(p) for n in (2, 3, 4) for p in product(SYLLABLES, repeat=n)][:30000]
+LEXICON_WEIGHTS = list(accumulate(1 / (rank + 1) for rank in range(len(LEXICON))))
+
+# Share of words drawn from the section / common lists, the rest comes from the lexicon
+SECTION_SHARE = 0.4
+
+
+def _words(rng, section, length):
+    words = SECTION_WORDS[section] + COMMON_WORDS
+    n_lexicon = sum(rng.random() >= SECTION_SHARE for _ in range(length))
+    picked = [rng.choice(words) for _ in range(length - n_lexicon)]
+    picked += rng.choices(LEXICON, cum_weights=LEXICON_WEIGHTS, k=n_lexicon)
+    rng.shuffle(picked)
+    return picked
+
+
+def _sentence(rng, section, length):
+    return " ".join(_words(rng, section, length)).capitalize() + "."
+
+
+def make_api_article(section, index, seed=0, body_sentences=20):
+    """
+    Builds one deterministic Guardian-shaped search result (the dict that
+    data_collection.create_article_content consumes).
+    index 0 is the oldest article of the section, one article per hour.
+    """
+    rng = random.Random(f"{seed}-{section}-{index}")
+    published = START_DATE + timedelta(hours=index)
+    article_id = f"{section}/{published:%Y/%b/%d}/synthetic-{section}-{index}".lower()
+    author = f"{section} writer {rng.randint(1, 40)}"
+    tags = [{"webTitle": SECTION_NAMES[section]}] + [
+        {"webTitle": " ".join(_words(rng, section, 2)).title()} for _ in range(rng.randint(1, 4))
+    ]
+    body = " ".join(_sentence(rng, section, rng.randint(8, 20)) for _ in range(body_sentences))
+
+    return {
+        "id": article_id,
+        "type": "article",
+        "sectionId": section,
+        "sectionName": SECTION_NAMES[section],
+        "webPublicationDate": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "webTitle": _sentence(rng, section, 8),
+        "webUrl": f"https://www.theguardian.com/{article_id}",
+        "fields": {
+            "headline": _sentence(rng, section, 8),
+            "byline": author.title(),
+            "trailText": f"<p>{_sentence(rng, section, 15)}</p>",
+            "bodyText": body,
+        },
+        "tags": tags,
+    }
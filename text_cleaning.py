@@ -0,0 +1,115 @@
+import re
+import string
+from concurrent.futures import ProcessPoolExecutor
+from itertools import filterfalse, product
+
+import nltk
+import pandas as pd
+from nltk.corpus import stopwords
+
+import metrics
+from clean_cache import text_key
+
+# The cleaning step of Pre-Processing.py, in an importable module
+# (a file name with a '-' cannot be imported) so later stages can reuse it.
+
+nltk.download('stopwords', quiet=True)
+
+STOP_WORDS = set(stopwords.words('english'))
+
+NON_LETTERS = re.compile(r'[^a-z\s]')
+
+# After NON_LETTERS every token is made of a-z only, so "shorter than 3 letters"
+# is a finite set (702 words) and both filters become one set lookup in C
+SHORT_WORDS = frozenset("".join(p) for n in (1, 2) for p in product(string.ascii_lowercase, repeat=n))
+
+# Distinct values per process-pool task
+CHUNK_SIZE = 5000
+
+
+def clean_text_noise(text):
+    """
+    מנקה רעשים ומסיר Stop Words (אותה פונקציה, תופעל על כל עמודה בנפרד)
+    """
+    if not isinstance(text, str):
+        return ""
+
+    # 1. המרה לקטנות
+    text = text.lower()
+
+    # 2. השארת אותיות בלבד
+    text = re.sub(r'[^a-z\s]', '', text)
+
+    # 3. טוקניזציה
+    words = text.split()
+
+    # 4. הסרת מילות עצירה ומילים קצרות
+    filtered_words = [w for w in words if w not in STOP_WORDS and len(w) > 2]
+
+    return " ".join(filtered_words)
+
+
+def normalize_authors(column):
+    """
+    ניקוי שם הכותב כמו ב-Pre-Processing: חסר -> unknown, אותיות קטנות, בלי 'by '.
+    """
+    authors = pd.Series(column, dtype=object).fillna('unknown').astype(str)
+    return authors.apply(lambda x: x.lower().replace('by ', '').strip())
+
+
+@metrics.timed("clean.clean_values")
+def clean_values(values, stop_words):
+    """The same four steps as clean_text_noise for a list of strings."""
+    sub = NON_LETTERS.sub
+    is_dropped = (frozenset(stop_words) | SHORT_WORDS).__contains__
+    return [" ".join(filterfalse(is_dropped, sub('', text.lower()).split())) for text in values]
+
+
+def clean_text_batch(column, stop_words=None, workers=1, cache=None):
+    """
+    clean_text_noise over a whole column at once, with byte-identical output.
+    Every distinct value is cleaned only once (tags and titles repeat a lot),
+    and with workers > 1 the distinct values are split over a process pool.
+    With a CleanCache (clean_cache.py) only values not cleaned in an earlier run are cleaned.
+    """
+    stop_words = STOP_WORDS if stop_words is None else stop_words
+    values = pd.Series(column, dtype=object)
+
+    # Anything that is not a string (NaN, numbers) becomes "", like clean_text_noise
+    is_text = values.map(lambda v: isinstance(v, str)).astype(bool)
+    uniques = pd.unique(values[is_text])
+    metrics.count("clean.values", len(values))
+
+    mapping = {}
+    if cache is not None:
+        cache.use_stop_words(stop_words)
+        keys = [text_key(text) for text in uniques]
+        cached = cache.get_many(keys)
+        missing = [(key, text) for key, text in zip(keys, uniques) if key not in cached]
+        mapping = {text: cached[key] for key, text in zip(keys, uniques) if key in cached}
+        uniques = [text for _, text in missing]
+
+    metrics.count("clean.values_cleaned", len(uniques))
+    if workers > 1 and len(uniques) > CHUNK_SIZE:
+        chunks = [uniques[i:i + CHUNK_SIZE] for i in range(0, len(uniques), CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            if metrics.ENABLED:
+                # The timers of the workers come back with their results
+                parts = []
+                for part, worker_metrics in pool.map(metrics.collecting, [clean_values] * len(chunks), chunks,
+                                                     [stop_words] * len(chunks)):
+                    metrics.merge(worker_metrics)
+                    parts.append(part)
+            else:
+                parts = pool.map(clean_values, chunks, [stop_words] * len(chunks))
+            cleaned = [text for part in parts for text in part]
+    else:
+        cleaned = clean_values(uniques, stop_words)
+
+    mapping.update(zip(uniques, cleaned))
+    if cache is not None and missing:
+        cache.put_many([(key, text) for (key, _), text in zip(missing, cleaned)])
+
+    result = pd.Series("", index=values.index, dtype=object)
+    result[is_text] = values[is_text].map(mapping)
+    return result
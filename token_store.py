@@ -0,0 +1,181 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer
+
+# Token ids of the cleaned text columns, written once by Pre-Processing next to
+# processed_data_separated.csv (same rows, same order), so the feature stage
+# builds its TF-IDF matrices from ids instead of re-tokenizing the strings.
+#
+# Layout of a token store directory:
+#   vocab.txt                  - one term per line, the line number is the id (shared by all fields)
+#   <field>.ids.bin            - uint32 ids of every row of the field, concatenated
+#   <field>.offsets.bin        - int64, row i is ids[offsets[i]:offsets[i + 1]]
+#   manifest.json              - rows, fields, vocabulary size and the fingerprint of the
+#                                CSV the tokens belong to; written last
+#
+# The feature stage only uses the ids when that fingerprint matches the CSV it
+# reads, so tokens left from an earlier Pre-Processing run are never used.
+
+MANIFEST_FILE = "manifest.json"
+VOCAB_FILE = "vocab.txt"
+ID_DTYPE = np.uint32
+OFFSET_DTYPE = np.int64
+
+
+def source_fingerprint(path):
+    """Size and mtime of the CSV the tokens were written next to."""
+    stat = Path(path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class TokenStoreWriter:
+    """Appends cleaned frames (space separated tokens per cell) chunk by chunk."""
+
+    def __init__(self, tokens_dir, fields):
+        self.dir = Path(tokens_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.dir / MANIFEST_FILE
+        if manifest_path.exists():
+            manifest_path.unlink()
+        self.fields = list(fields)
+        self.vocab = {}
+        self.rows = 0
+        self.totals = dict.fromkeys(self.fields, 0)
+        self.files = {}
+        for field in self.fields:
+            ids_file = open(self.dir / f"{field}.ids.bin", "wb")
+            offsets_file = open(self.dir / f"{field}.offsets.bin", "wb")
+            offsets_file.write(np.zeros(1, dtype=OFFSET_DTYPE).tobytes())
+            self.files[field] = (ids_file, offsets_file)
+
+    def add_frame(self, df):
+        for field in self.fields:
+            self._add_column(field, df[field].fillna('').tolist())
+        self.rows += len(df)
+
+    def _add_column(self, field, values):
+        # Cleaned cells are words joined by single spaces, so one split of the
+        # whole column gives every token and the space count gives the row lengths
+        terms = " ".join(values).split()
+        lengths = np.fromiter((text.count(" ") + 1 if text else 0 for text in values),
+                              dtype=OFFSET_DTYPE, count=len(values))
+        if lengths.sum() != len(terms):
+            lengths = np.fromiter((len(text.split()) for text in values), dtype=OFFSET_DTYPE, count=len(values))
+
+        codes, uniques = pd.factorize(pd.Series(terms, dtype=object))
+        vocab = self.vocab
+        global_ids = np.array([vocab.setdefault(term, len(vocab)) for term in uniques], dtype=ID_DTYPE)
+
+        ids_file, offsets_file = self.files[field]
+        ids_file.write(global_ids[codes].tobytes() if len(terms) else b"")
+        offsets_file.write((self.totals[field] + np.cumsum(lengths)).tobytes())
+        self.totals[field] += len(terms)
+
+    def close(self, source=None):
+        """Finishes the store. source: the CSV written with the same rows, now complete."""
+        for ids_file, offsets_file in self.files.values():
+            ids_file.close()
+            offsets_file.close()
+        with open(self.dir / VOCAB_FILE, "w", encoding="utf-8") as f:
+            f.writelines(term + "\n" for term in self.vocab)
+
+        manifest = {"rows": self.rows, "fields": self.fields, "vocab_size": len(self.vocab),
+                    "source": source_fingerprint(source) if source is not None and Path(source).exists() else None}
+        tmp_path = self.dir / (MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.dir / MANIFEST_FILE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_tokens(tokens_dir, source=None):
+    """
+    (rows, vocabulary as a numpy array of terms, {field: (ids, offsets)}), the
+    id arrays memory-mapped. None when there is no finished token store, or
+    (with source) when it was not written for that CSV as it is now.
+    """
+    tokens_dir = Path(tokens_dir)
+    if not (tokens_dir / MANIFEST_FILE).exists():
+        return None
+    with open(tokens_dir / MANIFEST_FILE, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if source is not None and manifest.get("source") != source_fingerprint(source):
+        print(f"Ignoring {tokens_dir}: it was written for another version of {Path(source).name}")
+        return None
+    with open(tokens_dir / VOCAB_FILE, encoding="utf-8") as f:
+        vocab = np.array(f.read().split("\n")[:manifest["vocab_size"]], dtype=str)
+
+    fields = {}
+    for field in manifest["fields"]:
+        ids_path = tokens_dir / f"{field}.ids.bin"
+        ids = (np.memmap(ids_path, dtype=ID_DTYPE, mode="r") if ids_path.stat().st_size
+               else np.zeros(0, dtype=ID_DTYPE))
+        offsets = np.memmap(tokens_dir / f"{field}.offsets.bin", dtype=OFFSET_DTYPE, mode="r")
+        fields[field] = (ids, offsets)
+    return manifest["rows"], vocab, fields
+
+
+def count_matrix(ids, offsets, vocab_size, drop=None, dtype=np.int64):
+    """Rows x vocabulary term counts from token ids, without the ids in drop."""
+    ids = np.asarray(ids)
+    offsets = np.asarray(offsets)
+    if drop is not None and len(drop):
+        keep = ~np.isin(ids, drop)
+        offsets = np.concatenate([[0], np.cumsum(keep)])[offsets]
+        ids = ids[keep]
+    counts = sparse.csr_matrix(
+        (np.ones(len(ids), dtype=dtype), ids.astype(np.int64), offsets),
+        shape=(len(offsets) - 1, vocab_size)
+    )
+    counts.sum_duplicates()
+    return counts
+
+
+def fit_tfidf_from_tokens(vectorizer, ids, offsets, vocab):
+    """
+    vectorizer.fit_transform(cleaned strings) from the token ids instead of the
+    strings: same vocabulary (alphabetical, max_features picked the way
+    CountVectorizer._limit_features does), same idf_, same matrix. Afterwards
+    the vectorizer transforms raw strings as usual.
+    Cleaned text is lowercase a-z words of 3+ letters, which the default
+    word analyzer splits exactly like str.split.
+    """
+    if (vectorizer.analyzer != "word" or vectorizer.ngram_range != (1, 1) or vectorizer.vocabulary is not None
+            or vectorizer.min_df != 1 or vectorizer.max_df != 1.0 or vectorizer.binary):
+        raise ValueError("fit_tfidf_from_tokens only reproduces the default word analyzer settings")
+
+    stop_words = vectorizer.get_stop_words() or ()
+    drop = np.flatnonzero(np.isin(vocab, list(stop_words)))
+    # Counts in the vectorizer's dtype, as CountVectorizer builds them, so the
+    # term frequencies max_features sorts on are the very same array
+    counts = count_matrix(ids, offsets, len(vocab), drop, dtype=vectorizer.dtype)
+
+    # Terms that occur, in alphabetical order, like CountVectorizer._sort_features
+    present = np.flatnonzero(np.bincount(counts.indices, minlength=len(vocab)))
+    present = present[np.argsort(vocab[present], kind="stable")]
+    counts = counts[:, present]
+
+    limit = vectorizer.max_features
+    if limit is not None and len(present) > limit:
+        tfs = np.asarray(counts.sum(axis=0)).ravel()
+        # The exact call _limit_features makes, so ties break the same way
+        kept = np.sort((-tfs).argsort()[:limit])
+        counts = counts[:, kept]
+        present = present[kept]
+
+    vectorizer.vocabulary_ = {str(term): i for i, term in enumerate(vocab[present])}
+    transformer = TfidfTransformer(norm=vectorizer.norm, use_idf=vectorizer.use_idf,
+                                   smooth_idf=vectorizer.smooth_idf, sublinear_tf=vectorizer.sublinear_tf)
+    transformer.fit(counts)
+    vectorizer.idf_ = transformer.idf_
+    return transformer.transform(counts, copy=False)
@@ -1,62 +1,71 @@
+import argparse
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
 from pathlib import Path
 
+import metrics
+from feature_analysis import top_terms
+from feature_pipeline import BUNDLE_FILE, FeaturePipeline
+from feature_store import MANIFEST_FILE, load_features, load_manifest
+from schema import FEATURE_DTYPE, fill_category, read_articles
+
 # נתיבים
 PROJECT_DIR = Path(r"C:\Users\yuval\Desktop\לימודים\ML")
 INPUT_FILE = PROJECT_DIR / "processed_data_separated.csv"
+# מה ש-feature_extraction_2 שמר: ה-FeaturePipeline המאומן ומטריצת המאפיינים (feature_store.py).
+# כשהם קיימים הדוח מחושב מהם, על בדיוק המאפיינים שהמודל מקבל
+MODEL_DIR = PROJECT_DIR / "models"
+FEATURES_DIR = PROJECT_DIR / "features"
 
+TAGS_TITLE = "TOP TF-IDF SCORES FOR TAGS"
+TRAIL_TITLE = "TOP TF-IDF SCORES FOR TRAIL TEXT"
 
-def print_top_features(df, column_name, title, vectorizer_params={'max_features': 1000}):
-    """
-    פונקציה גנרית לניתוח TF-IDF והדפסה בשורה אחת
-    """
+
+def print_analysis_header(title):
     print("\n" + "=" * 60)
     print(f"ANALYSIS: {title}")
     print("=" * 60)
 
+
+def print_top_terms(top):
+    """
+    מדפיסה את {label: [(term, score)]} של top_terms, קטגוריה בשורה אחת
+    """
+    for label, terms in top.items():
+        print(f"\nCategory: {label.upper()}")
+
+        # יצירת הרשימה המופרדת בפסיקים
+        results = [f"{term} ({score:.3f})" for term, score in terms if score > 0]
+
+        print(", ".join(results))
+
+
+def print_top_features(df, column_name, title, vectorizer_params={'max_features': 1000}):
+    """
+    פונקציה גנרית לניתוח TF-IDF והדפסה בשורה אחת (מאמנת TF-IDF חדש על העמודה)
+    """
+    print_analysis_header(title)
+
     # מילוי חוסרים
     df[column_name] = df[column_name].fillna('')
 
     # חישוב TF-IDF
     print(f"Calculating TF-IDF for {column_name}...")
-    tfidf = TfidfVectorizer(**vectorizer_params)
+    tfidf = TfidfVectorizer(dtype=FEATURE_DTYPE, **vectorizer_params)
     tfidf_matrix = tfidf.fit_transform(df[column_name])
     feature_names = np.array(tfidf.get_feature_names_out())
 
-    unique_labels = df['label'].unique()
-
-    for label in unique_labels:
-        # שליפת השורות של הקטגוריה
-        indices = df.index[df['label'] == label].tolist()
-        if not indices: continue
-
-        # חישוב ממוצע הציון לכל מילה בקטגוריה
-        class_matrix = tfidf_matrix[indices]
-        mean_scores = np.array(class_matrix.mean(axis=0)).flatten()
-
-        # מיון ולקחת את ה-10 הכי חזקים
-        top_indices = mean_scores.argsort()[-10:][::-1]
-
-        print(f"\nCategory: {label.upper()}")
-
-        # יצירת הרשימה המופרדת בפסיקים
-        results = []
-        for i in top_indices:
-            if mean_scores[i] > 0:
-                results.append(f"{feature_names[i]} ({mean_scores[i]:.3f})")
-
-        print(", ".join(results))
+    # ממוצע הציון לכל מילה בכל קטגוריה, ה-10 הכי חזקים (כל הקטגוריות בבת אחת)
+    top = top_terms(tfidf_matrix, df['label'], feature_names, k=10)
+    print_top_terms(top)
+    return top
 
 
 def analyze_top_specialists(df):
-    print("\n" + "=" * 60)
-    print("PART 3: TOP 10 SPECIALIST AUTHORS")
-    print("=" * 60)
-
     # ניקוי וסינון כותבים
-    df['author'] = df['author'].fillna('unknown')
+    df['author'] = fill_category(df['author'], 'unknown')
     df_clean = df[~df['author'].isin(['unknown', 'unknown author', 'guardian staff'])]
 
     # יצירת המטריצה
@@ -66,12 +75,41 @@ def analyze_top_specialists(df):
     active_authors = author_matrix[author_matrix.sum(axis=1) >= 3].copy()
 
     if active_authors.empty:
-        print("No active authors found.")
+        print_top_specialists(None)
         return
 
     # זיהוי מומחים (כתבו בקטגוריה אחת בלבד)
     is_specialist = (active_authors > 0).sum(axis=1) == 1
-    specialists = active_authors[is_specialist].copy()
+    print_top_specialists(active_authors[is_specialist].copy())
+
+
+def specialists_from_features(X_authors, labels, authors):
+    """
+    טבלת כותב x קטגוריה (כמו ה-crosstab ב-analyze_top_specialists) לכותבים המומחים
+    של ה-FeaturePipeline, מעמודות ה-auth_ שלהם: מספר הכתבות של כותב בקטגוריה
+    הוא סכום העמודה שלו בשורות של אותה קטגוריה, לכל הכותבים במכפלה דלילה אחת.
+    """
+    codes, uniques = pd.factorize(pd.Series(labels))
+    indicator = sparse.csr_matrix(
+        (np.ones(len(codes)), (codes, np.arange(len(codes)))), shape=(len(uniques), len(codes))
+    )
+    counts = (indicator @ X_authors).T.toarray().astype(np.int64)
+    table = pd.DataFrame(counts, index=pd.Index(authors, name='author'), columns=list(uniques))
+    # סדר הקטגוריות כמו ב-crosstab
+    return table[sorted(table.columns)]
+
+
+def print_top_specialists(specialists):
+    """
+    specialists: טבלת כותב x קטגוריה של כותבים שכתבו בקטגוריה אחת בלבד (None = אין כותבים פעילים)
+    """
+    print("\n" + "=" * 60)
+    print("PART 3: TOP 10 SPECIALIST AUTHORS")
+    print("=" * 60)
+
+    if specialists is None:
+        print("No active authors found.")
+        return
 
     # --- התיקון נמצא כאן ---
     # קודם מחשבים את הערכים, ורק בסוף מכניסים לטבלה
@@ -97,24 +135,81 @@ def analyze_top_specialists(df):
         print(f"{author:<30} | {row['Category']:<15} | {row['Article_Count']}")
 
 
-def main():
-    if not INPUT_FILE.exists():
+def report_from_artifacts(model_dir, features_dir):
+    """
+    הדוח מה-FeaturePipeline ומטריצת המאפיינים ש-feature_extraction_2 שמר, בלי לקרוא
+    את ה-CSV ובלי לאמן TF-IDF: אותן מילים ואותם ציונים שהמודל מקבל.
+    """
+    pipeline = FeaturePipeline.load(model_dir)
+    manifest = load_manifest(features_dir)
+    # המטריצה חייבת להיות מאותו אימון של ה-pipeline, אחרת שמות המילים לא שייכים לעמודות
+    fit_id = getattr(pipeline, "fit_id", None)
+    if fit_id is None or manifest.get("fit_id") != fit_id:
+        raise ValueError(f"{Path(model_dir) / BUNDLE_FILE} and {features_dir} are not from the same "
+                         f"feature_extraction_2 run, run it again")
+    X, _, labels = load_features(features_dir)
+
+    # כל בלוק (trail / tag / auth) הוא טווח עמודות במטריצה, לפי הסדר ב-manifest
+    spans = {}
+    start = 0
+    for block in manifest["blocks"]:
+        spans[block["name"]] = (start, start + block["columns"])
+        start += block["columns"]
+    names = {"trail": pipeline.trail_vectorizer.get_feature_names_out(),
+             "tag": pipeline.tags_vectorizer.get_feature_names_out(),
+             "auth": pipeline.authors}
+    for name, (lo, hi) in spans.items():
+        if name not in names or len(names[name]) != hi - lo:
+            raise ValueError(f"{features_dir} has a {name} block of {hi - lo} columns, "
+                             f"the fitted pipeline has {len(names.get(name, []))}")
+
+    # 1. תגיות, 2. מיני-כותרת: ממוצע הציון לכל מילה בכל קטגוריה, ה-10 הכי חזקים
+    for name, title in (("tag", TAGS_TITLE), ("trail", TRAIL_TITLE)):
+        lo, hi = spans[name]
+        print_analysis_header(title)
+        print_top_terms(top_terms(X[:, lo:hi], labels, names[name], k=10))
+
+    # 3. הכותבים המומחים הם בדיוק עמודות ה-auth_ (לפחות 3 כתבות, בקטגוריה אחת בלבד)
+    lo, hi = spans["auth"]
+    print_top_specialists(specialists_from_features(X[:, lo:hi], labels, pipeline.authors))
+
+
+@metrics.stage("report")
+def main(input_file=INPUT_FILE, model_dir=MODEL_DIR, features_dir=FEATURES_DIR, refit=False):
+    """
+    כשיש מאפיינים שמורים ב-model_dir / features_dir, הדוח מחושב מהם (report_from_artifacts).
+    refit=True, או כשאין עדיין כאלה: TF-IDF חדש על processed_data_separated.csv כמו פעם.
+    """
+    manifest_path = Path(features_dir) / MANIFEST_FILE
+    if not refit and (Path(model_dir) / BUNDLE_FILE).exists() and manifest_path.exists():
+        if input_file.exists() and input_file.stat().st_mtime > manifest_path.stat().st_mtime:
+            print(f"Warning: {input_file.name} is newer than the features in {features_dir}, "
+                  f"run feature_extraction_2 to report on the current data.")
+        print(f"Loading fitted features from {model_dir} and {features_dir}...")
+        report_from_artifacts(model_dir, features_dir)
+        return
+
+    if not input_file.exists():
         print("Error: processed_data_separated.csv not found.")
         return
 
     print("Loading data...")
-    df = pd.read_csv(INPUT_FILE)
+    # בלי body ו-date, שלא משמשים כאן (label ו-author נטענים כקטגוריות, schema.py)
+    df = read_articles(input_file, columns=['label', 'trail_text', 'tags', 'author'])
 
     # 1. ניתוח תגיות (Tags)
-    print_top_features(df, 'tags', "TOP TF-IDF SCORES FOR TAGS", {'max_features': 500})
+    print_top_features(df, 'tags', TAGS_TITLE, {'max_features': 500})
 
     # 2. ניתוח מיני-כותרת (Trail Text)
-    print_top_features(df, 'trail_text', "TOP TF-IDF SCORES FOR TRAIL TEXT",
-                       {'max_features': 1000, 'stop_words': 'english'})
+    print_top_features(df, 'trail_text', TRAIL_TITLE, {'max_features': 1000, 'stop_words': 'english'})
 
     # 3. ניתוח כותבים מומחים (Top 10)
     analyze_top_specialists(df)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Top terms and specialist authors per category")
+    parser.add_argument("--refit", action="store_true",
+                        help="fit new TF-IDF vectorizers on the processed CSV instead of using the saved features")
+    args = parser.parse_args()
+    main(refit=args.refit)